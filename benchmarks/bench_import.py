@@ -0,0 +1,174 @@
+'''
+Import-time report of the app modules, i.e. the work a new server process does before it can
+answer the first request of a page.
+
+Every entry point is imported in a fresh interpreter with python -X importtime, after Streamlit
+itself, which the server has loaded before it runs the app. The report lists the modules the entry
+point imports with their own and cumulative import time, including the work done at module level
+(e.g. files read on import). Runs from any directory:
+
+    python benchmarks/bench_import.py                   # compare with import_baseline.json
+    python benchmarks/bench_import.py --save-baseline   # store the results as new baseline
+
+Import times of a single run vary by a third and more, so every entry point is imported --repeat
+times after one unrecorded import that writes the bytecode caches, and the median total is
+recorded, for the baseline as for the check. An entry point is a regression if its median exceeds
+the median of the baseline by more than --tolerance (relative) and --min-delta-ms (absolute); in
+that case the exit code is 1. The defaults are above the spread of the medians of unchanged code
+and below the cost of an eagerly imported heavy dependency such as plotly. Timings are only
+comparable on the machine the baseline was recorded on, see the machine section of the baseline.
+'''
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCHMARK_DIR.parent
+
+BASELINE_FILE = BENCHMARK_DIR / 'import_baseline.json'
+RESULTS_FILE = BENCHMARK_DIR / 'import_results.json'
+
+# entry points and the modules they import: the app with its start page, and the modules of the
+# other pages, which are imported when the page is opened first
+ENTRY_POINTS = {
+    'app': 'app',
+    'climate_strategy': 'climate_strategy',
+    'datasets': 'datasets',
+    'dashboard': 'dashboard',
+}
+# loaded by the Streamlit server before the app runs, not counted
+PRELOADED = 'streamlit'
+# number of modules listed per entry point
+TOP_MODULES = 15
+
+
+def parse_importtime(output: str, preloaded: str) -> list:
+    '''
+    Returns the modules imported after preloaded as dicts with module, self_us, cumulative_us and
+    top_level (imported by the entry point itself and not by another module).
+    '''
+    modules = []
+    started = False
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        module = name.strip()
+        if not started:
+            started = module == preloaded and name.startswith(' ') and not name.startswith('  ')
+            continue
+        modules.append({
+            'module': module,
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'top_level': not name.startswith('  '),
+        })
+    return modules
+
+
+def measure(entry_point: str) -> dict:
+    command = [sys.executable, '-X', 'importtime', '-c', f'import {PRELOADED}; import {entry_point}']
+    env = dict(os.environ, PYTHONPATH=str(ROOT_DIR / 'source'))
+    process = subprocess.run(command, cwd=ROOT_DIR, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f'import of {entry_point} failed:\n{process.stderr[-2000:]}')
+    modules = parse_importtime(process.stderr, PRELOADED)
+    return {
+        'total_ms': sum(module['cumulative_us'] for module in modules if module['top_level']) / 1000,
+        'num_modules': len(modules),
+        'modules': sorted(modules, key=lambda module: module['cumulative_us'], reverse=True)[:TOP_MODULES],
+    }
+
+
+def measure_median(entry_point: str, repeat: int) -> dict:
+    '''
+    Imports the entry point repeat times after one unrecorded import and returns the run with the
+    median total, with the median, min and max of all totals.
+    '''
+    measure(entry_point)
+    runs = sorted((measure(entry_point) for _ in range(repeat)), key=lambda result: result['total_ms'])
+    totals = [result['total_ms'] for result in runs]
+    return {
+        **runs[len(runs) // 2],
+        'total_ms': statistics.median(totals),
+        'min_ms': totals[0],
+        'max_ms': totals[-1],
+        'repeat': repeat,
+    }
+
+
+def machine_info() -> dict:
+    import numpy as np
+    import pandas as pd
+    import streamlit as st
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'streamlit': st.__version__,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Import-time report of the app modules.')
+    parser.add_argument('--repeat', type=int, default=9, help='imports per entry point, the median is recorded')
+    parser.add_argument('--output', default=str(RESULTS_FILE), help='file the results are written to')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help='baseline to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative increase of the median')
+    parser.add_argument('--min-delta-ms', type=float, default=25, help='allowed absolute increase of the median')
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, entry_point in ENTRY_POINTS.items():
+        result = {'entry_point': name, **measure_median(entry_point, args.repeat)}
+        print(f"{name:<20} {result['total_ms']:10.1f} ms median ({result['min_ms']:.1f} - {result['max_ms']:.1f}) "
+              f"{result['num_modules']:6d} modules")
+        for module in result['modules']:
+            print(f"    {module['module']:<56} {module['self_us'] / 1000:8.1f} ms self "
+                  f"{module['cumulative_us'] / 1000:8.1f} ms cumulative")
+        results.append(result)
+
+    report = {'machine': machine_info(), 'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f'baseline written to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'no baseline found at {args.baseline}')
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline['machine'] != report['machine']:
+        print('warning: the baseline was recorded on another machine or with other library versions')
+    if any('repeat' not in result for result in baseline['results']):
+        print('warning: the baseline holds best-of totals, record medians with --save-baseline')
+    baseline_results = {result['entry_point']: result for result in baseline['results']}
+    regressions = 0
+    for result in results:
+        reference = baseline_results.get(result['entry_point'])
+        if reference is None:
+            continue
+        delta = result['total_ms'] - reference['total_ms']
+        if delta > args.min_delta_ms and delta > args.tolerance * reference['total_ms']:
+            print(f"REGRESSION {result['entry_point']} median total_ms: "
+                  f"{reference['total_ms']:.1f} -> {result['total_ms']:.1f}")
+            regressions += 1
+    print(f'{regressions} regression(s) against {args.baseline}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
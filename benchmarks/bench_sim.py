@@ -0,0 +1,271 @@
+'''
+Benchmarks of the simulation hot paths on synthetic inputs.
+
+Every case builds a synthetic goal in a temporary directory (scenario intervals, base data and
+factors.csv) with the given fleet size, number of simulated years and number of scenarios, and
+measures run, calc_factors, predict_base_values, get_factors and save of a CarSimulation
+declared on these inputs. Runs headless, Streamlit is not needed:
+
+    python benchmarks/bench_sim.py                   # all cases, compare with baseline.json
+    python benchmarks/bench_sim.py --quick           # smallest and largest case only
+    python benchmarks/bench_sim.py --save-baseline   # store the results as new baseline
+
+For every function the best wall time of --repeat calls is recorded, peak and retained memory
+and the number of retained memory blocks are measured with tracemalloc in one additional call.
+The results are written to --output as JSON. A measurement is a regression if it exceeds the
+baseline by more than --tolerance (relative) and --min-delta-s / --min-delta-bytes (absolute);
+in that case the exit code is 1. Timings are only comparable on the machine the baseline was
+recorded on, see the machine section of the baseline.
+'''
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARK_DIR.parent / 'source'))
+
+from sim.base_sim import (  # noqa: E402
+    FACTORS_FILE, FLEET_CHECKPOINTS, SCENARIO_INTERVALS_FILE, SIM_START_YEAR, TIME_SERIES_FILE
+)
+from sim.cache import RESULT_CACHE  # noqa: E402
+from sim.m1 import BaseData, CarSimulation  # noqa: E402
+
+BASELINE_FILE = BENCHMARK_DIR / 'baseline.json'
+RESULTS_FILE = BENCHMARK_DIR / 'results.json'
+
+FLEET_SIZES = [60_000, 600_000, 6_000_000]
+HORIZONS = [17, 40, 80]
+NUM_SCENARIOS = [3, 30, 100]
+QUICK_CASES = [(60_000, 17, 3), (6_000_000, 80, 100)]
+FUNCTIONS = ['run', 'calc_factors', 'predict_base_values', 'get_factors', 'save']
+# length of the synthetic intervals in years
+INTERVAL_YEARS = 5
+SHARE_ELECTRIC_START = 0.04
+
+
+def write_inputs(path: str, num_vehicles: int, num_years: int, num_scenarios: int, seed: int = 0):
+    '''
+    Writes synthetic input files of goal M1 to path. The scenarios differ in fleet growth (f1),
+    replacement age (f2) and in how fast the share of emission free new registrations (f3)
+    approaches 100%.
+    '''
+    rng = np.random.default_rng(seed)
+    last_year = SIM_START_YEAR + num_years - 1
+    rows = []
+    for i in range(num_scenarios):
+        growth = rng.uniform(0.99, 1.01)
+        replacement_age = rng.uniform(8, 15)
+        share_start = rng.uniform(0.1, 0.4)
+        years_to_full = rng.uniform(5, 30)
+        for year_from in range(SIM_START_YEAR, last_year + 1, INTERVAL_YEARS):
+            year_to = min(year_from + INTERVAL_YEARS - 1, last_year)
+            shares = [min(1.0, share_start + (1 - share_start) * (year - SIM_START_YEAR) / years_to_full)
+                      for year in (year_from, year_to)]
+            for factor, value_from, value_to in [
+                ('f1', growth, growth),
+                ('f2', replacement_age, replacement_age),
+                ('f3', shares[0], shares[1]),
+            ]:
+                rows.append(('M1', f'S{i}', factor, year_from, year_to, value_from, value_to))
+    intervals = pd.DataFrame(rows, columns=['ziel', 'szenario', 'faktor', 'jahr_von', 'jahr_bis', 'wert_von', 'wert_bis'])
+    intervals.to_csv(os.path.join(path, SCENARIO_INTERVALS_FILE), sep=';', index=False)
+
+    history = []
+    for year in range(SIM_START_YEAR - 3, SIM_START_YEAR):
+        total = num_vehicles
+        history.append((BaseData.TS_TOTAL.value, year, total))
+        history.append((BaseData.TS_ELECTRIC.value, year, round(total * SHARE_ELECTRIC_START)))
+    pd.DataFrame(history, columns=['ts_id', 'jahr', 'wert']).to_csv(os.path.join(path, TIME_SERIES_FILE), sep=';', index=False)
+
+    pd.DataFrame(columns=['ziel', 'jahr', 'serie', 'wert', 'szenario']).to_csv(
+        os.path.join(path, FACTORS_FILE), sep=';', index=False
+    )
+
+
+def synthetic_simulation(path: str, num_years: int) -> CarSimulation:
+    '''
+    Returns a CarSimulation reading and writing its files in path and simulating num_years years.
+    '''
+    simulation_class = type('SyntheticCarSimulation', (CarSimulation,), {
+        'data_path': path,
+        'first_year': SIM_START_YEAR,
+        'last_year': SIM_START_YEAR + num_years - 1,
+    })
+    simulation = simulation_class('M1')
+    # results of the synthetic goal in the result store, so that get_factors reads a realistic partition
+    simulation.run()
+    simulation.save()
+    return simulation
+
+
+def reset(simulation):
+    '''
+    Drops all memoized state, so that every measured call does the full work.
+    '''
+    RESULT_CACHE.clear()
+    FLEET_CHECKPOINTS.clear()
+    simulation._factor_table = None
+    simulation._factor_table_key = None
+
+
+def benchmark_calls(simulation) -> dict:
+    '''
+    Returns the measured functions as pairs of a setup and the call to measure.
+    '''
+    def setup_base_values():
+        reset(simulation)
+        simulation.result_dict = simulation.calc_factors()
+
+    return {
+        'run': (lambda: reset(simulation), simulation.run),
+        'calc_factors': (lambda: reset(simulation), simulation.calc_factors),
+        'predict_base_values': (setup_base_values, simulation.predict_base_values),
+        'get_factors': (lambda: None, simulation.get_factors),
+        'save': (lambda: simulation.run(), simulation.save),
+    }
+
+
+def measure(setup, call, repeat: int) -> dict:
+    wall_times = []
+    for _ in range(repeat):
+        setup()
+        start = time.perf_counter()
+        call()
+        wall_times.append(time.perf_counter() - start)
+
+    setup()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = call()
+        memory_after, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    retained_blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return {
+        'wall_time_s': min(wall_times),
+        'peak_memory_bytes': peak - memory_before,
+        'retained_memory_bytes': memory_after - memory_before,
+        'retained_blocks': retained_blocks,
+    }
+
+
+def run_case(num_vehicles: int, num_years: int, num_scenarios: int, repeat: int) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as path:
+        write_inputs(path, num_vehicles, num_years, num_scenarios)
+        simulation = synthetic_simulation(path, num_years)
+        for function, (setup, call) in benchmark_calls(simulation).items():
+            result = {
+                'case': case_name(function, num_vehicles, num_years, num_scenarios),
+                'function': function,
+                'vehicles': num_vehicles,
+                'years': num_years,
+                'scenarios': num_scenarios,
+            }
+            result.update(measure(setup, call, repeat))
+            results.append(result)
+    return results
+
+
+def case_name(function: str, num_vehicles: int, num_years: int, num_scenarios: int) -> str:
+    return f'{function}[vehicles={num_vehicles},years={num_years},scenarios={num_scenarios}]'
+
+
+def machine_info() -> dict:
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def find_regressions(results: list, baseline: dict, tolerance: float, min_delta_s: float,
+                     min_delta_bytes: int) -> list:
+    '''
+    Compares wall time and peak memory of every measurement with the baseline.
+
+    Returns:
+        list: one dict per regression with case, metric, baseline and current value.
+    '''
+    baseline_results = {result['case']: result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        reference = baseline_results.get(result['case'])
+        if reference is None:
+            continue
+        for metric, min_delta in [('wall_time_s', min_delta_s), ('peak_memory_bytes', min_delta_bytes)]:
+            delta = result[metric] - reference[metric]
+            if delta > min_delta and delta > tolerance * reference[metric]:
+                regressions.append({
+                    'case': result['case'],
+                    'metric': metric,
+                    'baseline': reference[metric],
+                    'current': result[metric],
+                })
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks of the simulation hot paths on synthetic inputs.')
+    parser.add_argument('--quick', action='store_true', help='run only the smallest and the largest case')
+    parser.add_argument('--repeat', type=int, default=3, help='timed calls per function, the best is recorded')
+    parser.add_argument('--output', default=str(RESULTS_FILE), help='file the results are written to')
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help='baseline to compare with')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to the baseline file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative increase')
+    parser.add_argument('--min-delta-s', type=float, default=0.005, help='allowed absolute increase of wall time')
+    parser.add_argument('--min-delta-bytes', type=int, default=1 << 20, help='allowed absolute increase of peak memory')
+    args = parser.parse_args(argv)
+
+    cases = QUICK_CASES if args.quick else list(itertools.product(FLEET_SIZES, HORIZONS, NUM_SCENARIOS))
+    results = []
+    for num_vehicles, num_years, num_scenarios in cases:
+        for result in run_case(num_vehicles, num_years, num_scenarios, args.repeat):
+            print(f"{result['case']:<70} {result['wall_time_s'] * 1000:10.2f} ms "
+                  f"{result['peak_memory_bytes'] / 1e6:10.2f} MB peak {result['retained_blocks']:8d} blocks")
+            results.append(result)
+
+    report = {'machine': machine_info(), 'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f'baseline written to {args.baseline}')
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f'no baseline found at {args.baseline}')
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    if baseline['machine'] != report['machine']:
+        print('warning: the baseline was recorded on another machine or with other library versions')
+    regressions = find_regressions(results, baseline, args.tolerance, args.min_delta_s, args.min_delta_bytes)
+    for regression in regressions:
+        print(f"REGRESSION {regression['case']} {regression['metric']}: "
+              f"{regression['baseline']:.6g} -> {regression['current']:.6g}")
+    print(f'{len(regressions)} regression(s) against {args.baseline}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
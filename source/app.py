@@ -1,6 +1,6 @@
+import logging
 import streamlit as st
 from streamlit_option_menu import option_menu
-from datasets import DataBrowser
 
 from climate_strategy import (
     ActionAreaTypes,
@@ -9,7 +9,6 @@ from climate_strategy import (
     show_data,
     show_scenarios,
 )
-from dashboard import Dashboard
 
 __version__ = "0.0.6"
 __author__ = "Statistisches Amt des Kantons Basel-Stadt"
@@ -19,6 +18,10 @@ GIT_REPO = "https://github.com/lcalmbach/climate-strategy-bs"
 MY_EMOJI = "🔮"
 MY_NAME = "KSS-Monitoring"
 
+# diagnostics of the simulations, see sim.profiling
+logging.basicConfig(format="%(asctime)s %(name)s %(levelname)s %(message)s")
+logging.getLogger("sim").setLevel(logging.INFO)
+
 
 def init():
     st.set_page_config(
@@ -74,7 +77,6 @@ def main():
         st.session_state["action-areas"] = {}
         for x in [member.value for member in ActionAreaTypes]:
             st.session_state["action-areas"][x] = ActionArea(x)
-        st.session_state['dashboard'] = Dashboard()
 
     menu_items, menu_icons = get_menu()
     with st.sidebar:
@@ -88,9 +90,14 @@ def main():
     if selected == "Referenzen":
         show_references()
     elif selected == "Daten":
+        # the modules of the pages are imported when the page is opened first
+        from datasets import DataBrowser
         app = DataBrowser()
         app.show_ui()
     elif selected == "Dashboard":
+        if 'dashboard' not in st.session_state:
+            from dashboard import Dashboard
+            st.session_state['dashboard'] = Dashboard()
         st.session_state['dashboard'].show_ui()
     else:
         action_area = [
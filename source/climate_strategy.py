@@ -1,13 +1,18 @@
 import streamlit as st
-import pandas as pd
 from enum import Enum
-from plots import show_area_plot, line_chart, test
 from metadata import action_areas as aa
 import json
 import os
 
-from sim import m1, m2, m3
+from sim.registry import SIM_DICT
+from sim.cache import RESULT_CACHE
+from sim.pool import SIMULATION_POOL
+from sim.profiling import SimulationProfiler
+from sim.survival import Retirement
+from sim.vehicle_ages import InitialAges
 from utils import convert_df
+from datastore import DATA_STORE
+from schemas import SchemaError
 
 # constants
 DATA_PATH = "./source/data/"
@@ -19,8 +24,6 @@ TIME_SERIES_GOALS = os.path.join(DATA_PATH, "time_series_goal.csv")
 DATASETS = os.path.join(DATA_PATH, "dataset.csv")
 SCENARIOS_FILE = os.path.join(DATA_PATH, "scenario.csv")
 
-SIM_DICT = {'M1': m1.CarSimulation, 'M2': m2.TruckSimulation}
-
 
 class DatasetTypes(Enum):
     base = 1
@@ -47,7 +50,7 @@ class Goal:
 
 
 def show_references():
-    df = pd.read_csv(REFERENCES, sep=";")
+    df = DATA_STORE.read(REFERENCES)
     st.markdown("## Referenzen")
     for index, row in df.iterrows():
         st.markdown(f'- [{row["text"]}]({row["url"]}): {row["description"]}')
@@ -71,7 +74,7 @@ def get_dic_datasets() -> dict:
     Returns:
         dict: A dictionary mapping dataset names to their IDs.
     """
-    df = pd.read_csv(DATASETS, sep=";")
+    df = DATA_STORE.read(DATASETS)
     return dict(zip(df["name"], df["id"]))
 
 
@@ -79,9 +82,6 @@ def show_data():
     st.markdown("## Zeitreihen")
 
 
-DIC_DATASETS = get_dic_datasets()
-
-
 class ActionArea:
     def __init__(self, id: ActionAreaTypes):
         self.id = id
@@ -106,33 +106,32 @@ class ActionArea:
     def current_goal(self, value):
         self._current_goal = value
         if value in SIM_DICT:
-            self.current_simulation = SIM_DICT[value](value)
+            profiler = None
+            if st.session_state.get("diagnostics"):
+                profiler = SimulationProfiler(trace_memory=st.session_state.get("diagnostics_memory", False))
+            self.current_simulation = SIMULATION_POOL.get(value, profiler=profiler)
         else:
             self.current_simulation = None
 
     def get_goal_datasets(self, goal: str, types: list) -> list:
-        df = pd.read_csv(TIME_SERIES_GOALS, sep=";")
-        df = df[(df["goal"] == goal) & (df["type"].isin(types))]
+        df = DATA_STORE.read(TIME_SERIES_GOALS, where={"goal": goal, "type": types})
         dataset_list = df["ts_id"]
         return dataset_list
 
     def get_plots(self, aa_id: str):
-        df = pd.read_csv(PLOTS, sep=";")
-        df = df[df["action_area"] == aa_id]
+        df = DATA_STORE.read(PLOTS, where={"action_area": aa_id})
         return df
 
     def get_time_series_options(self, id: str) -> list:
-        df = pd.read_csv(INDICATORS_METADATA, sep=";")
+        df = DATA_STORE.read(INDICATORS_METADATA)
         return list(df["kategorie"])
 
     def get_hist_data(self, aa_id: str):
-        df = pd.read_csv(TIME_SERIES, sep=";")
-        df = df[df["kategorie1"].isin(self.time_series_options)]
+        df = DATA_STORE.read(TIME_SERIES, where={"kategorie1": self.time_series_options})
         return df
 
     def get_scenarios(self, aa_id: str):
-        df = pd.read_csv(SCENARIOS_FILE, sep=";")
-        df = df[df["kategorie"].isin(self.time_series_options)]
+        df = DATA_STORE.read(SCENARIOS_FILE, where={"kategorie": self.time_series_options})
         return df
 
     def __repr__(self) -> str:
@@ -145,6 +144,8 @@ class ActionArea:
         if plot["plot_type"] == "bar":
             st.bar_chart(df)
         if plot["plot_type"] == "area":
+            # plotly express is imported on the first plot, not on startup
+            from plots import show_area_plot
             settings = json.loads(plot["plot_settings"])
             fig = show_area_plot(df, settings)
         st.plotly_chart(fig)
@@ -188,6 +189,81 @@ class ActionArea:
                 
 
         
+    def show_solver(self):
+        """
+        Lets the user search the value of a constant factor for which the goal indicator just reaches
+        the target value in the target year.
+        """
+        sim = self.current_simulation
+        factor_bounds = {"f1": (0.9, 1.1), "f2": (1.0, 20.0), "f3": (0.0, 1.0)}
+        with st.expander("🎯Zielerreichung berechnen"):
+            st.markdown(
+                f"Gesucht ist der konstante Wert eines Faktors, bei dem {sim.target_value}% im Jahr "
+                f"{sim.target_year} erreicht werden. Die übrigen Faktoren entsprechen dem gewählten Szenario."
+            )
+            cols = st.columns(4)
+            with cols[0]:
+                scenario = st.selectbox("Szenario", options=sim.scenario_names, key="solver_scenario")
+            with cols[1]:
+                factor = st.selectbox("Faktor", options=sim.factor_names, key="solver_factor")
+            lower, upper = factor_bounds.get(factor, (0.0, 1.0))
+            with cols[2]:
+                lower = st.number_input("Von", value=lower, key=f"solver_lower_{factor}")
+            with cols[3]:
+                upper = st.number_input("Bis", value=upper, key=f"solver_upper_{factor}")
+            if st.button("Berechnen", key="solver_run"):
+                result = sim.solve(factor, lower, upper, scenario=scenario)
+                if result["solved"]:
+                    st.success(
+                        f'{factor} = {result["value"]:.3f} ({result["evaluations"]} Auswertungen in {result["steps"]} Schritten)'
+                    )
+                    st.dataframe(result["trajectory"], hide_index=True)
+                else:
+                    st.warning(
+                        f"Das Ziel wird an beiden oder an keiner der Grenzen erreicht, zwischen {lower} und {upper} gibt es keine Lösung."
+                    )
+
+    def show_diagnostics(self):
+        """
+        Shows the time and memory used by the phases of the simulation in the current rerun and writes
+        them to the log. Measuring is switched on here and takes effect with the next rerun.
+        """
+        sim = self.current_simulation
+        with st.expander("🩺Diagnostik"):
+            cols = st.columns(2)
+            with cols[0]:
+                st.toggle("Laufzeiten messen", key="diagnostics")
+            with cols[1]:
+                st.toggle("Speicherbedarf messen", key="diagnostics_memory")
+            if sim.profiler is not None:
+                report = sim.profiler.report()
+                st.dataframe(report, hide_index=True)
+                sim.profiler.log_report(repr(sim))
+            stats = RESULT_CACHE.stats()
+            st.caption(
+                f'Resultat-Cache: {stats["size"]}/{stats["max_size"]} Einträge, Trefferquote {stats["hit_rate"]:.0%}, '
+                f'{stats["waits"]} Mal auf laufende Berechnung gewartet'
+            )
+            stats = SIMULATION_POOL.stats()
+            st.caption(
+                f'Simulationen im Speicher: {stats["size"]}, {stats["bytes"] / 2**20:.1f} von {stats["max_bytes"] / 2**20:.0f} MB, '
+                f'Trefferquote {stats["hit_rate"]:.0%}, {stats["evictions"]} verdrängt'
+            )
+            stats = DATA_STORE.stats()
+            st.caption(
+                f'Tabellen im Speicher: {stats["tables"]}, {stats["bytes"] / 2**20:.1f} MB, '
+                f'{stats["reads"]} Dateien gelesen, {stats["hits"]} Zugriffe aus dem Speicher'
+            )
+            from sim.warmup import WARMUP
+            status = WARMUP.status()
+            if status["seconds"] is not None:
+                st.caption(
+                    f'Vorberechnung beim Serverstart: {status["state"]} nach {status["seconds"]:.1f} s, '
+                    f'{status["tables"]} Tabellen, Ziele {", ".join(status["goals"]) or "-"}'
+                    + (f', ohne Intervalle: {", ".join(status["skipped"])}' if status["skipped"] else '')
+                    + (f', Fehler: {", ".join(status["errors"])}' if status["errors"] else '')
+                )
+
     def show_ui(self):
         st.markdown(f"## {self.title}")
         tabs = st.tabs(["Info", "Ziele", "Basisdaten", "Bewertung"])
@@ -208,19 +284,59 @@ class ActionArea:
                     allow_edit = st.toggle("Bearbeiten", value=False)
                     df = self.current_simulation.intervals_df
                     edited_df = st.data_editor(df)
+                    for factor, description in self.current_simulation.factor_descriptions.items():
+                        st.caption(f"{factor}: {description}")
+                    issues = self.current_simulation.get_factor_table().issues
+                    if len(issues) > 0:
+                        st.warning("Die Intervalle enthalten Lücken (gap) oder Überlappungen (overlap):")
+                        st.dataframe(issues, hide_index=True)
+                    sim = self.current_simulation
+                    survival_scenarios = st.multiselect(
+                        "Szenarien mit Ausserbetriebnahme nach Überlebenskurve (Weibull, mittleres Alter f2)",
+                        options=sim.scenario_names,
+                        default=[s for s in sim.scenario_names if sim.get_retirement(s) == Retirement.SURVIVAL],
+                        key=f"survival_{self.current_goal}",
+                    )
+                    sim.scenario_retirement = {
+                        s: Retirement.SURVIVAL if s in survival_scenarios else Retirement.AGE_LIMIT
+                        for s in sim.scenario_names
+                    }
+                    if sim.age_histogram is not None:
+                        registry_ages = st.checkbox(
+                            "Altersverteilung des Anfangsbestands aus dem Fahrzeugregister",
+                            value=sim.initial_ages == InitialAges.REGISTRY,
+                            key=f"registry_ages_{self.current_goal}",
+                        )
+                        sim.initial_ages = InitialAges.REGISTRY if registry_ages else InitialAges.UNIFORM
                     if allow_edit:
                         if st.button('Speichern'):
-                            self.current_simulation.save_edits(edited_df)
-                            st.success('Die Änderungen wurden erfolgreich gespeichert. Führe eine Neuberechnung durch, um die Auswirkungen in der Grafik sichtbar zu machen.')
+                            try:
+                                self.current_simulation.save_edits(edited_df)
+                                st.success('Die Änderungen wurden erfolgreich gespeichert. Führe eine Neuberechnung durch, um die Auswirkungen in der Grafik sichtbar zu machen.')
+                            except SchemaError as e:
+                                st.error(f'Die Änderungen wurden nicht gespeichert, die Intervalle sind unvollständig oder ungültig: {e}')
                         if st.button("🧮Neu Berechnen"):
                             self.current_simulation.run()
                             self.current_simulation.save()
+                    num_replicates = st.number_input("Anzahl Replikate", min_value=10, max_value=10000, value=1000, step=100)
+                    # the simulation is a new copy on every rerun, the ensemble of the session is kept
+                    # in session_state as long as the intervals, options and replicates do not change
+                    ensemble_state = f"ensemble_{self.current_goal}"
+                    ensemble_key = sim.get_ensemble_key(num_replicates, seed=0)
+                    if st.button("🎲Unsicherheit berechnen"):
+                        with st.spinner("Monte-Carlo-Simulation läuft..."):
+                            st.session_state[ensemble_state] = (ensemble_key, sim.run_ensemble(num_replicates, seed=0))
+                    key, ensemble_df = st.session_state.get(ensemble_state, (None, None))
+                    if key == ensemble_key:
+                        sim.ensemble_df = ensemble_df
                 with st.expander("Beschreibung der Szenarien"):
                     st.write(goal["scenarios"])
                 st.markdown("---")
                 st.markdown("***Ziel-Indikator(en):***")
                 for key, goal in goal["goal-indicators"].items():
                     self.display_goal_indicator(goal, self.current_goal)
+                self.show_solver()
+                self.show_diagnostics()
             else:
                 st.warning("Dieses Ziel hat noch keine Simulation")
 
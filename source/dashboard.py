@@ -2,7 +2,7 @@ import streamlit as st
 import pandas as pd
 import os
 import random
-from plots import scatter_plot
+from datastore import DATA_STORE
 
 DATA_PATH = './source/data'
 GOAL_STATUS_FILE = os.path.join(DATA_PATH, 'goal_status.csv')
@@ -14,7 +14,7 @@ class Dashboard():
         self.goals_df = self.get_data()
 
     def get_data(self):
-        df = pd.read_csv(GOAL_STATUS_FILE, sep=";")
+        df = DATA_STORE.read(GOAL_STATUS_FILE)
         return df
 
     def get_fake_data(self, base):
@@ -56,6 +56,8 @@ class Dashboard():
         return year, df
     
     def show_plot(self, base):
+        # plotly express is imported on the first plot, not on startup
+        from plots import scatter_plot
         df = self.get_fake_data(base)
         settings = {
             'x': 'jahr',
@@ -1,31 +1,93 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import os
 import random
-from plots import scatter_plot
+import threading
+from datastore import DATA_STORE
 
 DATA_PATH = './source/data'
 DATASETS_FILE = os.path.join(DATA_PATH, 'dataset.csv')
 TIME_SERIES_FILE = os.path.join(DATA_PATH, 'time_series.csv')
 GOAL_STATUS_FILE = os.path.join(DATA_PATH, 'goal_status.csv')
 TIME_SERIES_GOALS_FILE = os.path.join(DATA_PATH, 'time_series_goal.csv')
+# number of values of a dataset shown per page
+PAGE_SIZE = 500
+
+
+class SeriesIndex():
+    """
+    Values of all time series sorted by ts_id and year, so that the years and values of a series
+    are a contiguous slice of two arrays, together with the goals every series is used in.
+    Looking up a series returns views of the arrays, nothing is filtered or copied.
+    """
+
+    def __init__(self, time_series_df: pd.DataFrame, time_series_goals: pd.DataFrame):
+        ts_ids = time_series_df['ts_id'].to_numpy()
+        years = time_series_df['jahr'].to_numpy()
+        order = np.lexsort((years, ts_ids))
+        self.years = years[order]
+        self.values = time_series_df['wert'].to_numpy()[order]
+        unique_ids, starts, counts = np.unique(ts_ids[order], return_index=True, return_counts=True)
+        self.slices = {
+            int(ts_id): slice(int(start), int(start + count))
+            for ts_id, start, count in zip(unique_ids, starts, counts)
+        }
+        self.goals = {}
+        for ts_id, goal in zip(time_series_goals['ts_id'], time_series_goals['goal']):
+            goals = self.goals.setdefault(int(ts_id), [])
+            if str(goal) not in goals:
+                goals.append(str(goal))
+
+    def __len__(self):
+        return len(self.years)
+
+    def get_series(self, ts_id: int):
+        """
+        Returns the years and values of a series as read-only views, empty arrays for unknown ids.
+        """
+        selection = self.slices.get(int(ts_id), slice(0, 0))
+        return self.years[selection], self.values[selection]
+
+    def get_goals(self, ts_id: int) -> list:
+        return self.goals.get(int(ts_id), [])
+
+
+_series_index = (None, None)
+_series_index_lock = threading.Lock()
+
+
+def get_series_index() -> SeriesIndex:
+    """
+    Returns the index of the time series, built once per version of the data files and shared
+    by all sessions.
+    """
+    global _series_index
+    version = (DATA_STORE.get_version(TIME_SERIES_FILE), DATA_STORE.get_version(TIME_SERIES_GOALS_FILE))
+    with _series_index_lock:
+        if _series_index[0] == version:
+            return _series_index[1]
+    index = SeriesIndex(DATA_STORE.read(TIME_SERIES_FILE), DATA_STORE.read(TIME_SERIES_GOALS_FILE))
+    with _series_index_lock:
+        _series_index = (version, index)
+    return index
+
 
 class DataBrowser():
     def __init__(self):
         self.datasets_df = self.get_datasets()
-        self.time_series_df = self.get_time_series()
-        self.time_series_goals = self.get_time_series_goals()
+        self.series_index = get_series_index()
 
     def get_time_series_goals(self):
-        df = pd.read_csv(TIME_SERIES_GOALS_FILE, sep=";")
+        df = DATA_STORE.read(TIME_SERIES_GOALS_FILE)
         return df
     
     def get_datasets(self):
-        df = pd.read_csv(DATASETS_FILE, sep=";")
+        df = DATA_STORE.read(DATASETS_FILE)
         return df
 
     def get_time_series(self):
-        df = pd.read_csv(TIME_SERIES_FILE, sep=";")
+        df = DATA_STORE.read(TIME_SERIES_FILE)
         return df
 
     def filter_data(self):
@@ -57,6 +119,8 @@ class DataBrowser():
         return year, df
     
     def show_plot(self, base):
+        # plotly express is imported on the first plot, not on startup
+        from plots import scatter_plot
         df = self.get_fake_data(base)
         settings = {
             'x': 'jahr',
@@ -71,10 +135,15 @@ class DataBrowser():
         st.plotly_chart(fig, width=300, height=300)
 
     def show_data(self, dataset, unit):
-        data_df = self.time_series_df[self.time_series_df['ts_id'] == dataset]
-        data_df.drop(columns=['ts_id'], inplace=True)
-        data_df.reset_index(drop=True, inplace=True)
-        data_df['einheit'] = unit
+        years, values = self.series_index.get_series(dataset)
+        num_pages = max(1, -(-len(years) // PAGE_SIZE))
+        page = 1
+        if num_pages > 1:
+            page = st.number_input(f'Seite (von {num_pages})', min_value=1, max_value=num_pages, value=1, step=1)
+            st.caption(f'{len(years)} Werte, {PAGE_SIZE} pro Seite')
+        # only the rows of the page are copied into the table sent to the browser
+        rows = slice((page - 1) * PAGE_SIZE, page * PAGE_SIZE)
+        data_df = pd.DataFrame({'jahr': years[rows], 'wert': values[rows], 'einheit': unit})
         st.dataframe(data_df)
 
     def show_ui(self):
@@ -87,10 +156,7 @@ class DataBrowser():
         )
         ds = self.datasets_df[self.datasets_df['id'] == dataset].iloc[0]
         st.write(f'Beschreibung: {ds["description"]}')
-        used_in = self.time_series_goals[self.time_series_goals['ts_id'] == dataset]
-        used_in = list(used_in['goal'].unique())
-        used_in = [str(x) for x in used_in]
-        used_in = ', '.join(used_in)
+        used_in = ', '.join(self.series_index.get_goals(dataset))
         st.write(f'Wird verwendet in: {used_in}')
         self.show_data(dataset, ds["unit"])
         
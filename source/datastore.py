@@ -0,0 +1,353 @@
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+import schemas
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# suffix of the binary cache written next to every CSV file
+CACHE_SUFFIX = ".npz"
+# suffix of the lock file serializing the writers of a CSV file
+LOCK_SUFFIX = ".lock"
+# storage of the tables: "csv" or "sqlite" for the indexed database of sqlstore.SqliteBackend
+DATA_BACKEND = os.environ.get("KSS_DATA_BACKEND", "csv")
+
+
+class DataStore():
+    """
+    Process-wide store of the CSV tables of the app. Every file is parsed once and kept until
+    its modification time or size changes, so reruns and page switches of all sessions read
+    from memory.
+
+    read returns a shallow copy of the stored table. The values are shared with the store and
+    marked read-only, so in-place changes such as df.loc[...] = ... raise a ValueError, while
+    filtering, adding or replacing columns work as usual and only change the copy. Categorical
+    columns cannot be marked read-only and are copied instead, see share. Files written
+    with write are read again from disk on the next access.
+
+    Tables with a schema in schemas.SCHEMAS are parsed into the dtypes of the schema, a file
+    that does not match its schema raises a schemas.SchemaError.
+
+    The first process that parses a CSV also stores it as typed binary columns in a cache file
+    next to it (name.csv.npz, see write_cache), other processes and later restarts load the
+    cache instead of parsing the CSV. The cache records modification time and size of the CSV
+    it was built from and is rebuilt as soon as the CSV has changed; the CSV remains the source.
+
+    Writes go to a temporary file that replaces the CSV atomically, so readers never block and
+    always see either the old or the new file. Writers of all sessions and processes are
+    serialized with a lock file next to the CSV (name.csv.lock), replace_rows reads the current
+    file while holding the lock, so concurrent updates of different parts of a table are merged
+    instead of overwriting each other.
+
+    With a backend (see sqlstore.SqliteBackend), the files it handles are written to the backend,
+    and read from it as soon as it holds their table. Reads with where are then answered by the
+    backend, e.g. from an index, instead of filtering the whole table.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._tables = {}
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.hits = 0
+
+    def uses_backend(self, path: str) -> bool:
+        """
+        True if the file at path is written to the backend.
+        """
+        return self.backend is not None and self.backend.handles(path)
+
+    def _get_backend(self, path: str):
+        # the backend the file at path is read from, None for the CSV file
+        if self.uses_backend(path) and self.backend.has_table(path):
+            return self.backend
+        return None
+
+    def get_version(self, path: str):
+        backend = self._get_backend(path)
+        if backend is not None:
+            return backend.get_version(path)
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def read(self, path: str, sep: str = ";", where: dict = None) -> pd.DataFrame:
+        """
+        Returns the table at path, or only the rows matching where, a dict of column and value or
+        list of values.
+        """
+        key = os.path.abspath(path)
+        backend = self._get_backend(key)
+        if backend is not None and where:
+            with self._lock:
+                self.reads += 1
+            return backend.read(key, where)
+        version = self.get_version(key)
+        with self._lock:
+            entry = self._tables.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                return select(entry[1], where) if where else share(entry[1])
+        if backend is not None:
+            df = backend.read(key)
+        else:
+            df = self._read_csv(key, version, sep)
+        # memory of the arrays, the text objects are not counted (deep=False), because measuring
+        # them takes longer than reading the cache
+        size = int(df.memory_usage(deep=False).sum())
+        df = freeze(df)
+        with self._lock:
+            self._tables[key] = (version, df, size)
+            self.reads += 1
+        return select(df, where) if where else share(df)
+
+    @staticmethod
+    def _read_csv(path: str, version: tuple, sep: str) -> pd.DataFrame:
+        schema = schemas.get_schema(path)
+        df = read_cache(path, version)
+        if df is None or (schema is not None and not schemas.matches(df, schema)):
+            df = pd.read_csv(path, sep=sep) if schema is None else schemas.read_csv(path, schema, sep)
+            write_cache(path, version, df)
+        return df
+
+    def write(self, path: str, df: pd.DataFrame, sep: str = ";"):
+        """
+        Replaces the table at path by df.
+
+        Raises:
+            schemas.SchemaError: if df does not match the schema of the table, the table is kept.
+        """
+        check_schema(path, df)
+        if self.uses_backend(path):
+            self.backend.write(path, df)
+        else:
+            with file_lock(path):
+                write_atomic(path, df, sep)
+        self.invalidate(path)
+
+    def replace_rows(self, path: str, column: str, value, df: pd.DataFrame, sep: str = ";") -> pd.DataFrame:
+        """
+        Replaces the rows of the table at path whose column equals value by df, the other rows are
+        kept. If the file does not exist, it is created with the rows of df.
+
+        Returns:
+            pd.DataFrame: the rows of df with column set to value, as written.
+
+        Raises:
+            schemas.SchemaError: if the merged table does not match the schema of the table, e.g.
+            because of a missing value in an int column; the table is kept.
+        """
+        df = df.assign(**{column: value})
+        if self.uses_backend(path):
+            check_schema(path, df)
+            self.backend.replace_rows(path, column, value, df)
+            self.invalidate(path)
+            return df
+        with file_lock(path):
+            if os.path.exists(path):
+                self.invalidate(path)
+                current = self.read(path, sep)
+                kept = current[current[column] != value]
+                if len(df) > 0:
+                    merged = pd.concat([kept.astype({column: object}), df[list(current.columns)]], ignore_index=True)
+                else:
+                    # pandas warns about concatenating an empty frame
+                    merged = kept
+            else:
+                merged = df
+            check_schema(path, merged)
+            write_atomic(path, merged, sep)
+        self.invalidate(path)
+        return df
+
+    def invalidate(self, path: str = None):
+        with self._lock:
+            if path is None:
+                self._tables.clear()
+            else:
+                self._tables.pop(os.path.abspath(path), None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "tables": len(self._tables),
+                "bytes": sum(size for _, _, size in self._tables.values()),
+                "reads": self.reads,
+                "hits": self.hits,
+                "backend": DATA_BACKEND if self.backend is not None else "csv",
+            }
+
+
+def select(df: pd.DataFrame, where: dict = None) -> pd.DataFrame:
+    """
+    Returns the rows of df matching where, a dict of column and value or list of values.
+    """
+    if not where:
+        return df
+    mask = np.ones(len(df), dtype=bool)
+    for column, value in where.items():
+        values = df[column]
+        mask &= (values.isin(value) if pd.api.types.is_list_like(value) else values == value).to_numpy()
+    return df[mask]
+
+
+def check_schema(path: str, df: pd.DataFrame):
+    """
+    Raises a schemas.SchemaError if the table at path has a schema and df does not match it.
+    """
+    schema = schemas.get_schema(path)
+    if schema is not None:
+        schemas.validate(df, schema, path)
+
+
+def get_backend():
+    if DATA_BACKEND == "sqlite":
+        from sqlstore import SqliteBackend
+        return SqliteBackend()
+    if DATA_BACKEND != "csv":
+        raise ValueError(f"unknown data backend {DATA_BACKEND!r}, expected csv or sqlite")
+    return None
+
+
+def get_cache_path(path: str) -> str:
+    return path + CACHE_SUFFIX
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Holds an exclusive lock on the lock file of path, waiting until other writers (threads or
+    processes) have released it.
+    """
+    with open(path + LOCK_SUFFIX, "a+") as file:
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def write_atomic(path: str, df: pd.DataFrame, sep: str = ";"):
+    """
+    Writes df to a temporary file in the directory of path and renames it to path, keeping the
+    permissions of the file it replaces.
+    """
+    handle, temp_name = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    os.close(handle)
+    try:
+        df.to_csv(temp_name, sep=sep, index=False)
+        if os.path.exists(path):
+            shutil.copymode(path, temp_name)
+        os.replace(temp_name, path)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.remove(temp_name)
+        raise
+
+
+def write_cache(path: str, version: tuple, df: pd.DataFrame):
+    """
+    Stores the columns of a table parsed from the CSV file at path as arrays in an uncompressed
+    npz file. Text and categorical columns are dictionary encoded: an array of the distinct values
+    (the categories) and int32 codes, -1 for missing values. If the cache cannot be written, e.g. in a read-only directory, the CSV is
+    simply parsed again next time.
+    """
+    arrays = {
+        "columns": np.array([str(column) for column in df.columns], dtype=str),
+        "version": np.array(version, dtype=np.int64),
+        "dtypes": np.array(schemas.get_dtypes(df), dtype=str),
+    }
+    for i, column in enumerate(df.columns):
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            arrays[f"codes_{i}"] = df[column].cat.codes.to_numpy(dtype=np.int32)
+            arrays[f"column_{i}"] = np.asarray(df[column].cat.categories, dtype=str)
+            continue
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            codes, uniques = pd.factorize(values)
+            arrays[f"codes_{i}"] = codes.astype(np.int32)
+            values = np.asarray(uniques, dtype=str)
+        arrays[f"column_{i}"] = values
+    temp_name = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=CACHE_SUFFIX, delete=False) as file:
+            temp_name = file.name
+            np.savez(file, **arrays)
+        os.replace(temp_name, get_cache_path(path))
+    except OSError:
+        if temp_name is not None and os.path.exists(temp_name):
+            os.remove(temp_name)
+
+
+def read_cache(path: str, version: tuple):
+    """
+    Returns the table cached for the CSV file at path, or None if there is no cache or it was
+    built from another version of the CSV.
+    """
+    try:
+        with np.load(get_cache_path(path), allow_pickle=False) as cache:
+            if tuple(cache["version"]) != tuple(version):
+                return None
+            columns = {}
+            for i, (column, dtype) in enumerate(zip(cache["columns"], cache["dtypes"])):
+                values = cache[f"column_{i}"]
+                if dtype == "category":
+                    values = pd.Categorical.from_codes(cache[f"codes_{i}"], values.astype(object))
+                elif f"codes_{i}" in cache:
+                    # the distinct values followed by NaN for the code -1
+                    uniques = np.append(values.astype(object), np.nan)
+                    values = uniques[cache[f"codes_{i}"]]
+                columns[str(column)] = values
+            return pd.DataFrame(columns, columns=[str(column) for column in cache["columns"]], copy=False)
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def share(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns a shallow copy of a table returned by freeze for a reader. The read-only numpy columns
+    are shared, the columns with extension dtypes are copied, so in-place changes of the copy
+    never reach the stored table. For categoricals only the codes are copied.
+    """
+    df = df.copy(deep=False)
+    for column in df.columns:
+        if not isinstance(df[column].dtype, np.dtype):
+            df[column] = df[column].copy()
+    return df
+
+
+def freeze(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the table with read-only column arrays, one array per column. The arrays are shared
+    with df, which must not be used afterwards. Columns with pandas extension dtypes (e.g.
+    categoricals) cannot be marked read-only, see share.
+    """
+    columns = {}
+    for column in df.columns:
+        if not isinstance(df[column].dtype, np.dtype):
+            columns[column] = df[column]
+            continue
+        values = df[column].to_numpy()
+        values.flags.writeable = False
+        columns[column] = values
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+DATA_STORE = DataStore(get_backend())
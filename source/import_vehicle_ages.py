@@ -0,0 +1,55 @@
+'''
+Aggregates an extract of the vehicle registry, one row per vehicle, into the age distribution
+of vehicle_ages.csv (see sim.vehicle_ages):
+
+    python source/import_vehicle_ages.py extract.csv --year 2023
+    python source/import_vehicle_ages.py extract.csv --year 2023 --sep , --class-column art
+
+The extract is streamed in chunks of --chunk-size rows, it is never read as a whole. The rows of
+the reference year in vehicle_ages.csv are replaced by the aggregate, other years are kept.
+'''
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from datastore import DATA_STORE
+from sim.base_sim import DATA_PATH, VEHICLE_AGES_FILE
+from sim.fleet import Powertrain
+from sim.vehicle_ages import (
+    CHUNK_SIZE, CLASS_COLUMN, EMISSION_FREE_FUELS, FUEL_COLUMN, REGISTRATION_YEAR_COLUMN, aggregate_registrations
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Aggregates an extract of the vehicle registry into vehicle_ages.csv.')
+    parser.add_argument('extract', help='CSV file with one row per registered vehicle')
+    parser.add_argument('--year', type=int, required=True, help='reference year of the extract')
+    parser.add_argument('--sep', default=';', help='separator of the extract')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='rows read at once')
+    parser.add_argument('--year-column', default=REGISTRATION_YEAR_COLUMN, help='year of the first registration')
+    parser.add_argument('--class-column', default=CLASS_COLUMN, help='vehicle class')
+    parser.add_argument('--fuel-column', default=FUEL_COLUMN, help='fuel or powertrain')
+    parser.add_argument('--emission-free', nargs='+', default=list(EMISSION_FREE_FUELS),
+                        help='fuels of the emission free vehicles')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    histogram = aggregate_registrations(
+        args.extract, args.year, args.sep, args.chunk_size, args.year_column, args.class_column,
+        args.fuel_column, args.emission_free,
+    )
+    DATA_STORE.replace_rows(os.path.join(DATA_PATH, VEHICLE_AGES_FILE), 'jahr', args.year, histogram.to_frame(args.year))
+    print(f'{histogram.rows} Fahrzeuge gelesen, {histogram.skipped} übersprungen, '
+          f'{time.perf_counter() - start:.1f} s')
+    for name, counts in zip(histogram.class_names, histogram.counts):
+        print(f'{name:<32} {counts[:, Powertrain.GAS.value].sum():>10} fossil '
+              f'{counts[:, Powertrain.ELECTRIC.value].sum():>10} emissionsfrei')
+    return 0
+
+
+if __name__ == '__main__':
+    # DATA_PATH is relative to the root of the repository
+    os.chdir(Path(__file__).resolve().parent.parent)
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 import numpy as np
 
 
@@ -90,3 +91,36 @@ def scatter_plot(df, settings: dict):
     )
 
     return fig
+
+
+def add_bands(fig, df, settings: dict):
+    """
+    Adds a shaded range between the columns settings["lower"] and settings["upper"] for
+    each group in settings["color"], using the color of the line with the same name.
+    """
+    line_colors = {trace.name: trace.line.color for trace in fig.data}
+    for name, group in df.groupby(settings["color"], sort=False):
+        color = line_colors.get(name, "#888888").lstrip("#")
+        red, green, blue = (int(color[i:i + 2], 16) for i in (0, 2, 4))
+        fig.add_trace(
+            go.Scatter(
+                x=group[settings["x"]],
+                y=group[settings["upper"]],
+                mode="lines",
+                line={"width": 0},
+                showlegend=False,
+                hoverinfo="skip",
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=group[settings["x"]],
+                y=group[settings["lower"]],
+                mode="lines",
+                line={"width": 0},
+                fill="tonexty",
+                fillcolor=f"rgba({red}, {green}, {blue}, 0.2)",
+                name=f"{name} ({settings['lower']}-{settings['upper']})",
+            )
+        )
+    return fig
@@ -0,0 +1,126 @@
+'''
+Recomputes the simulations of all goals without the Streamlit app, e.g. nightly from cron:
+
+    python source/recompute.py                  # all goals registered in SIM_DICT
+    python source/recompute.py --goals M1 M2 --workers 2
+
+The goals run concurrently in a process pool. The results of every recomputed goal replace its
+partitions in the result store (data/factors/<goal>/<scenario>.csv), and simulation_summary.csv
+is written with the value of the goal indicator in the target year and the year the target is
+reached, per goal and scenario. The results of goals that are not recomputed or fail are kept.
+Goals without scenario intervals have nothing to simulate and are skipped.
+
+Exit codes: 0 if all goals were recomputed or skipped, 1 if at least one goal failed, 2 for invalid arguments.
+'''
+import argparse
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+from datastore import DATA_STORE
+from sim.base_sim import DATA_PATH, DEFAULT_SEED, FACTORS_FILE, RESULTS_DIR, SCENARIO_INTERVALS_FILE
+from sim.registry import SIM_DICT
+from sim.results import ResultStore
+
+SUMMARY_FILE = 'simulation_summary.csv'
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def run_goal(goal: str, seed) -> dict:
+    '''
+    Runs the simulation of a goal. Used as worker in the process pool, errors are returned
+    instead of raised so that the other goals are still written.
+
+    Returns:
+        dict: goal, seconds, results (melted as in factors.csv, one frame per scenario), summary,
+        skipped (reason if the goal was not simulated, else None) and error (None if successful).
+    '''
+    start = time.perf_counter()
+    results, summary, skipped, error = None, None, None, None
+    try:
+        simulation = SIM_DICT[goal](goal)
+        if simulation.has_intervals():
+            simulation.run(seed)
+            results, summary = simulation.get_result_frames(), simulation.get_summary()
+        else:
+            skipped = f'keine Intervalle in {SCENARIO_INTERVALS_FILE}'
+    except Exception:
+        error = traceback.format_exc()
+    return {
+        'goal': goal,
+        'seconds': time.perf_counter() - start,
+        'results': results,
+        'summary': summary,
+        'skipped': skipped,
+        'error': error,
+    }
+
+
+def write_results(runs: list, data_path: str):
+    '''
+    Replaces the results of the successfully recomputed goals in the result store and writes
+    the summary.
+    '''
+    succeeded = [run for run in runs if run['error'] is None and run['skipped'] is None]
+    if not succeeded:
+        return
+    store = ResultStore(os.path.join(data_path, RESULTS_DIR), legacy_file=os.path.join(data_path, FACTORS_FILE))
+    for run in succeeded:
+        store.write(run['goal'], run['results'])
+    recomputed = [run['goal'] for run in succeeded]
+
+    summary = pd.concat([run['summary'] for run in succeeded], ignore_index=True)
+    summary_file = os.path.join(data_path, SUMMARY_FILE)
+    if os.path.exists(summary_file):
+        previous = DATA_STORE.read(summary_file)
+        summary = pd.concat([previous[~previous['ziel'].isin(recomputed)], summary], ignore_index=True)
+    DATA_STORE.write(summary_file, summary)
+
+
+def print_timing(runs: list, total_seconds: float):
+    print(f"{'Ziel':<6} {'Status':<8} {'Sekunden':>9}")
+    for run in runs:
+        status = 'FEHLER' if run['error'] is not None else 'leer' if run['skipped'] is not None else 'ok'
+        print(f"{run['goal']:<6} {status:<8} {run['seconds']:9.3f}")
+    print(f"{'total':<6} {'':<8} {total_seconds:9.3f}")
+    for run in runs:
+        if run['skipped'] is not None:
+            print(f"{run['goal']} übersprungen: {run['skipped']}")
+    for run in runs:
+        if run['error'] is not None:
+            print(f"\n{run['goal']}:\n{run['error']}", file=sys.stderr)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Recomputes the simulations of all goals.')
+    parser.add_argument('--goals', nargs='+', default=list(SIM_DICT.keys()), help='goals to recompute (default: all)')
+    parser.add_argument('--workers', type=int, default=None, help='size of the process pool (default: number of CPUs)')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='seed of the initial fleets')
+    parser.add_argument('--no-save', action='store_true', help='only run the simulations, do not write any files')
+    args = parser.parse_args(argv)
+    unknown = [goal for goal in args.goals if goal not in SIM_DICT]
+    if unknown:
+        print(f"unbekannte Ziele: {', '.join(unknown)}", file=sys.stderr)
+        return EXIT_USAGE
+
+    start = time.perf_counter()
+    max_workers = min(args.workers or os.cpu_count() or 1, len(args.goals))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        runs = list(executor.map(run_goal, args.goals, [args.seed] * len(args.goals)))
+    if not args.no_save:
+        write_results(runs, DATA_PATH)
+    print_timing(runs, time.perf_counter() - start)
+    return EXIT_OK if all(run['error'] is None for run in runs) else EXIT_FAILED
+
+
+if __name__ == '__main__':
+    # DATA_PATH is relative to the root of the repository
+    os.chdir(Path(__file__).resolve().parent.parent)
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Column names and dtypes of the tables in source/data, in the order of the columns in the file.
+# Years, ids and whole-number status values are small ints, repeated labels categoricals. Results
+# are stored as float32; time series and interval values are inputs of the simulations and keep
+# float64.
+SCHEMAS = {
+    "time_series.csv": {
+        "ts_id": "int16",
+        "jahr": "int16",
+        "wert": "float64",
+    },
+    "factors.csv": {
+        "ziel": "category",
+        "jahr": "int16",
+        "serie": "category",
+        "wert": "float32",
+        "szenario": "category",
+    },
+    "scenario_intervals.csv": {
+        "ziel": "category",
+        "szenario": "category",
+        "faktor": "category",
+        "jahr_von": "int16",
+        "jahr_bis": "int16",
+        "wert_von": "float64",
+        "wert_bis": "float64",
+    },
+    "goal_status.csv": {
+        "ziel": "category",
+        "jahr": "int16",
+        "ziel_wert": "int16",
+        "wert_soll_jahr": "int16",
+        "wert_ist_jahr": "int16",
+        "bewertung": "int8",
+    },
+    "dataset.csv": {
+        "id": "int16",
+        "name": "object",
+        "description": "object",
+        "unit": "category",
+    },
+    "time_series_goal.csv": {
+        "ts_id": "int16",
+        "goal": "category",
+        "type": "int8",
+    },
+    "vehicle_ages.csv": {
+        "jahr": "int16",
+        "klasse": "category",
+        "antrieb": "int8",
+        "alter": "int16",
+        "anzahl": "int32",
+    },
+}
+# directories of partitioned tables, path/<partition>/.../<name>.csv, and the table of their files
+PARTITIONED_TABLES = {
+    "factors": "factors.csv",
+}
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def get_schema(path: str):
+    """
+    Returns the schema of a data file, identified by its name or, for the partitions of a
+    partitioned table, by the directory of the table. None if the file has no schema.
+    """
+    name = os.path.basename(path)
+    if name in SCHEMAS:
+        return SCHEMAS[name]
+    for directory in os.path.normpath(os.path.dirname(path)).split(os.sep):
+        if directory in PARTITIONED_TABLES:
+            return SCHEMAS[PARTITIONED_TABLES[directory]]
+    return None
+
+
+def read_csv(path: str, schema: dict, sep: str = ";") -> pd.DataFrame:
+    """
+    Parses a CSV file straight into the dtypes of the schema.
+
+    Raises:
+        SchemaError: if the columns differ from the schema or a value does not fit its dtype,
+        e.g. a missing or non-numeric value in an int column.
+    """
+    columns = list(pd.read_csv(path, sep=sep, nrows=0).columns)
+    if columns != list(schema):
+        raise SchemaError(f"{path}: columns {columns} do not match the schema {list(schema)}")
+    # ints are parsed as int64 and narrowed after a range check, read_csv would wrap around
+    int_columns = [column for column, dtype in schema.items() if pd.api.types.is_integer_dtype(dtype)]
+    try:
+        df = pd.read_csv(path, sep=sep, dtype={**schema, **dict.fromkeys(int_columns, "int64")})
+    except (ValueError, TypeError, OverflowError) as e:
+        raise SchemaError(f"{path}: values do not match the schema {schema}: {e}") from e
+    for column in int_columns:
+        limits = np.iinfo(schema[column])
+        if len(df) > 0 and (df[column].min() < limits.min or df[column].max() > limits.max):
+            raise SchemaError(f"{path}: values of {column} exceed the range of {schema[column]}")
+        df[column] = df[column].astype(schema[column])
+    return df
+
+
+def validate(df: pd.DataFrame, schema: dict, path: str = ""):
+    """
+    Checks that df can be written to the file at path and read again with the schema, so a bad
+    edit is rejected before it replaces the file instead of failing every later read.
+
+    Raises:
+        SchemaError: if the columns differ from the schema, a value of an int column is missing,
+        not a whole number or out of range, or a value of a float column is not numeric.
+    """
+    columns = [str(column) for column in df.columns]
+    if columns != list(schema):
+        raise SchemaError(f"{path}: columns {columns} do not match the schema {list(schema)}")
+    for column, dtype in schema.items():
+        if dtype in ("category", "object"):
+            continue
+        try:
+            values = pd.to_numeric(df[column].astype(object), errors="raise").astype(float).to_numpy()
+        except (ValueError, TypeError) as e:
+            raise SchemaError(f"{path}: values of {column} are not numeric: {e}") from e
+        if not pd.api.types.is_integer_dtype(dtype):
+            continue
+        if np.isnan(values).any():
+            raise SchemaError(f"{path}: {column} has missing values")
+        limits = np.iinfo(dtype)
+        if (values != np.round(values)).any() or (values < limits.min).any() or (values > limits.max).any():
+            raise SchemaError(f"{path}: values of {column} do not fit {dtype}")
+
+
+def get_dtypes(df: pd.DataFrame) -> list:
+    return [str(dtype) for dtype in df.dtypes]
+
+
+def matches(df: pd.DataFrame, schema: dict) -> bool:
+    return list(df.columns) == list(schema) and get_dtypes(df) == list(schema.values())
@@ -0,0 +1,37 @@
+'''
+Starts the Streamlit server of the app with a warmup (see sim.warmup.Warmup): while the server
+starts, the tables are loaded and the simulations of all goals are built and run in background
+threads of the server process, so that the first requests after a deploy or restart find them
+in memory. Takes the options of streamlit run:
+
+    python source/serve.py
+    python source/serve.py --server.port 8080 --server.headless true
+
+Without warmup, the app is started as before with streamlit run source/app.py.
+'''
+import logging
+import os
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def main() -> int:
+    # DATA_PATH is relative to the root of the repository
+    os.chdir(ROOT_DIR)
+    # source is on sys.path as directory of this script, so the app imports the same modules
+    # and shares the pool and caches filled by the warmup
+    from sim.warmup import WARMUP
+    from streamlit.web import cli
+
+    # as in app.py, which configures logging only with the first session
+    logging.basicConfig(format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    logging.getLogger("sim").setLevel(logging.INFO)
+    WARMUP.start()
+    sys.argv = ['streamlit', 'run', str(ROOT_DIR / 'source' / 'app.py'), *sys.argv[1:]]
+    return cli.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,49 +1,876 @@
-import streamlit as st
 from enum import Enum
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import itertools
+import math
+import multiprocessing
 import os
+import sys
+import threading
+from pathlib import Path
+import numpy as np
 import pandas as pd
+from sim.intervals import FactorTable, intervals_key, expand_variants, parameter_name, parse_parameter
+from sim.cache import RESULT_CACHE, content_key
+from sim.fleet import Fleet, Powertrain
+from sim.history import FleetHistory
+from sim.profiling import profiled
+from sim.survival import Retirement, oldest_age, retirement_probabilities, stationary_age_distribution
+from sim.vehicle_ages import InitialAges, get_age_distribution
+# Add the parent directory to sys.path
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from datastore import DATA_STORE
+from sim.results import ResultStore
 
 DATA_PATH = './source/data'
-TIME_SERIES_FILE = os.path.join(DATA_PATH, 'time_series.csv')
-SCENARIO_INTERVALS = os.path.join(DATA_PATH, 'scenario_intervals.csv')
+TIME_SERIES_FILE = 'time_series.csv'
+SCENARIO_INTERVALS_FILE = 'scenario_intervals.csv'
+# age distribution of the registered vehicles, see sim.vehicle_ages
+VEHICLE_AGES_FILE = 'vehicle_ages.csv'
+# results of all goals in a single file, read for goals without partitions in RESULTS_DIR
+FACTORS_FILE = 'factors.csv'
+# results partitioned by goal and scenario, see ResultStore
+RESULTS_DIR = 'factors'
 
 
 SIM_START_YEAR = 2024
 SIM_END_YEAR = 2040
 
+# percentiles of the monte carlo ensemble shown as bands
+PERCENTILES = (5, 50, 95)
+# seed of the initial fleet used by run(), so that repeated runs give the same result
+DEFAULT_SEED = 0
+# part of the result cache key, must be increased whenever a change of the engine changes results
+ENGINE_VERSION = 2
+# per-year fleet states of the last simulation of every goal, see FleetSimulation.simulate_fleet.
+# Kept per process and not per instance, because the app builds a new simulation on every rerun.
+# Entries are replaced as a whole under FLEET_CHECKPOINTS_LOCK and never modified afterwards.
+FLEET_CHECKPOINTS = {}
+FLEET_CHECKPOINTS_LOCK = threading.Lock()
+
+
+def run_replicates(simulation, seeds) -> np.ndarray:
+    '''
+    Runs the simulation once per seed. Used as worker in the process pool of run_ensemble.
+    The factor table is compiled once, only the fleet turnover is repeated.
+
+    Returns:
+        np.ndarray: target series with shape (replicates, scenarios, years).
+    '''
+    simulation.profiler = None
+    simulation.get_factor_table()
+    simulation.checkpoints_enabled = False
+    simulation.history_enabled = False
+    results = []
+    for seed in seeds:
+        results.append(simulation.simulate_fleet(seed)[simulation.target_time_series_name])
+    return np.stack(results)
+
+
+def count_frames(simulation, frames: dict):
+    return sum(len(df) for df in frames.values()), None
+
+
+def count_scenario_years(simulation, result):
+    return len(simulation.scenario_names) * len(simulation.years), None
+
+
 class BaseSimulation():
-    def __init__(self, target):
+    # directory of the input and result files
+    data_path = DATA_PATH
+    # simulated years, first_year - 1 is the last year with base data
+    first_year = SIM_START_YEAR
+    last_year = SIM_END_YEAR
+    # SimulationProfiler collecting the phases decorated with profiled, None disables profiling
+    profiler = None
+    # files read when the simulation is built, see get_input_version
+    input_files = [SCENARIO_INTERVALS_FILE]
+
+    def __init__(self, target, profiler=None):
         self.target = target
+        self.profiler = profiler
         self.intervals_df = self.get_intervals()
         self.factor_names = list(self.intervals_df['faktor'].unique())
         self.scenario_names = list(self.intervals_df['szenario'].unique())
+        self.ensemble_df = None
+        self._factor_table = None
+        self._factor_table_key = None
     
+    @classmethod
+    def data_file(cls, file_name: str) -> str:
+        return os.path.join(cls.data_path, file_name)
+
+    @classmethod
+    def get_result_store(cls) -> ResultStore:
+        return ResultStore(cls.data_file(RESULTS_DIR), legacy_file=cls.data_file(FACTORS_FILE))
+
+    @classmethod
+    def get_input_version(cls, target=None) -> tuple:
+        '''
+        Returns modification time and size of the input files and of the saved results of target.
+        A simulation built from the files is up to date as long as the version does not change.
+        '''
+        version = []
+        for file_name in cls.input_files:
+            try:
+                version.append((file_name, *DATA_STORE.get_version(cls.data_file(file_name))))
+            except FileNotFoundError:
+                version.append((file_name, None, None))
+        if target is not None:
+            version.append((RESULTS_DIR, cls.get_result_store().get_version(target)))
+        return tuple(version)
+
+    def memory_usage(self) -> int:
+        '''
+        Estimated number of bytes held by the simulation.
+        '''
+        frames = [self.intervals_df] + list(getattr(self, 'result_dict', {}).values())
+        if self.ensemble_df is not None:
+            frames.append(self.ensemble_df)
+        return int(sum(df.memory_usage(deep=True).sum() for df in frames))
+
+    @property
+    def years(self) -> np.ndarray:
+        return np.arange(self.first_year, self.last_year + 1)
+
+    @profiled('get_intervals', lambda simulation, df: (len(df), None))
     def get_intervals(self):
-        df = pd.read_csv(SCENARIO_INTERVALS, sep=';')
-        df = df[df['ziel'] == self.target]
+        df = DATA_STORE.read(self.data_file(SCENARIO_INTERVALS_FILE), where={'ziel': self.target})
         return df
 
     def save_edits(self, df):
-        df.to_csv(SCENARIO_INTERVALS, sep=';', index=False)
-        self.intervals_df = df
+        '''
+        Saves the edited intervals of this goal, the intervals of other goals in the file are kept.
+        '''
+        self.intervals_df = DATA_STORE.replace_rows(self.data_file(SCENARIO_INTERVALS_FILE), 'ziel', self.target, df)
+
+    def has_intervals(self) -> bool:
+        '''
+        False for goals without rows in scenario_intervals.csv, i.e. without scenarios and factors.
+        Such goals have nothing to simulate, see run.
+        '''
+        return len(self.scenario_names) > 0
+
+    def get_factor_table(self) -> FactorTable:
+        '''
+        Returns the factor table compiled from intervals_df. The table is compiled again only
+        if the content of intervals_df has changed since the last call.
+        '''
+        key = intervals_key(self.intervals_df)
+        if key != self._factor_table_key:
+            self._factor_table = FactorTable(self.intervals_df, self.first_year, self.last_year)
+            self._factor_table_key = key
+        return self._factor_table
+
+    def get_factor_values(self, factors: list) -> np.ndarray:
+        '''
+        Returns the values of the given factors for all scenarios and years as array with
+        shape (factors, scenarios, years).
+        '''
+        table = self.get_factor_table()
+        return np.stack([table.values[:, table.factor_names.index(factor), :] for factor in factors])
+
+    @profiled('calc_factors', count_frames)
+    def calc_factors(self) -> dict:
+        '''
+        Returns a dict with one DataFrame per scenario holding the factors for every
+        simulation year.
+        '''
+        return self.get_factor_table().to_frames()
+
+    @profiled('get_factors', count_frames)
+    def get_factors(self):
+        '''data read from the melted format and unmeldetd into a dict with one dataframe per scenario,
+        only the partitions of the scenarios of this goal are read
+        '''
+        my_scenarios = {}
+        for scenario, df_scenario in self.get_result_store().read_scenarios(self.target, self.scenario_names).items():
+            df_scenario = df_scenario.pivot(index='jahr', columns='serie', values='wert')
+            # plain column labels instead of the categories of serie, so that columns can be added
+            df_scenario.columns = df_scenario.columns.astype(str)
+            df_scenario = df_scenario.rename_axis(None, axis=1)
+            my_scenarios[scenario] = df_scenario
+        return my_scenarios
 
+    @profiled('save', lambda simulation, result: (sum(df.size for df in simulation.result_dict.values()), None))
     def save(self):
         '''data is saved in the deleted format with 1 row per factor and base data item
         when read it is unmelted into the pivot format: year, factor1, factor2, time series1 
+        only the partitions of this goal are replaced, the results of other goals are kept
+        '''
+        self.get_result_store().write(self.target, self.get_result_frames())
+
+    def get_result_frames(self) -> dict:
         '''
-        df = pd.DataFrame()
+        Returns result_dict in the melted format of factors.csv: ziel, jahr, serie, wert, szenario,
+        one DataFrame per scenario.
+        '''
+        frames = {}
         for scenario in self.scenario_names:
             values = self.result_dict[scenario].reset_index()
             df_factor = values.melt(id_vars=['jahr'], var_name='serie', value_name='wert')
             df_factor['szenario'] = scenario
             df_factor['ziel'] = self.target
             column_order = ['ziel', 'jahr', 'serie', 'wert', 'szenario']
-            df_factor = df_factor[column_order]
-            df = pd.concat([df, df_factor])
-        df.to_csv(os.path.join(DATA_PATH, 'factors.csv'), sep=';', index=False)
+            frames[scenario] = df_factor[column_order]
+        return frames
+
+    def get_result_frame(self) -> pd.DataFrame:
+        '''
+        Returns the results of all scenarios in the melted format of factors.csv.
+        '''
+        return pd.concat(list(self.get_result_frames().values()), ignore_index=True)
+
+    def get_target_values(self) -> np.ndarray:
+        '''
+        Returns the target time series of the last run as array with shape (scenarios, years).
+        '''
+        return np.array([
+            self.result_dict[scenario][self.target_time_series_name].to_numpy(dtype=float)
+            for scenario in self.scenario_names
+        ])
+
+    def get_summary(self) -> pd.DataFrame:
+        '''
+        Summarizes the last run per scenario: value of the target time series in target_year
+        and the first year in which target_value is reached (missing if never).
+        '''
+        values = self.get_target_values()
+        reached = values >= self.target_value
+        first_years = pd.Series(np.where(reached.any(axis=1), self.years[reached.argmax(axis=1)], -1), dtype='Int64')
+        return pd.DataFrame({
+            'ziel': self.target,
+            'szenario': self.scenario_names,
+            'jahr_ziel': self.target_year,
+            'ziel_wert': self.target_value,
+            'wert': values[:, self.target_year - self.first_year],
+            'jahr_ziel_erreicht': first_years.mask(first_years < 0),
+        })
+
+    def get_ensemble_key(self, num_replicates: int, seed) -> str:
+        '''
+        Returns the key of an ensemble: the key of the result cache (see get_cache_key) and the
+        number of replicates.
+        '''
+        return content_key('ensemble', self.get_cache_key(seed), num_replicates)
+
+    def run_ensemble(self, num_replicates: int = 1000, seed=None, max_workers=None) -> pd.DataFrame:
+        '''
+        Runs num_replicates independently seeded replicates of run() in a process pool and
+        summarizes the target time series per scenario and year as percentile bands.
+
+        The replicates are split into one chunk per worker, so each worker receives the
+        simulation only once. result_dict of this instance is not changed.
+
+        Returns:
+            pd.DataFrame: columns jahr, szenario, p5, p50, p95. Also stored in ensemble_df.
+        '''
+        seeds = np.random.SeedSequence(seed).spawn(num_replicates)
+        max_workers = min(max_workers or os.cpu_count() or 1, num_replicates)
+        chunks = [seeds[i::max_workers] for i in range(max_workers)]
+        if max_workers == 1:
+            values = run_replicates(copy.deepcopy(self), seeds)
+        else:
+            # spawn instead of the default fork: a fork of the multi-threaded server copies locks
+            # held by other threads, e.g. FLEET_CHECKPOINTS_LOCK, and the worker would wait forever
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+                values = np.concatenate(list(executor.map(run_replicates, [self] * max_workers, chunks)))
+
+        bands = np.percentile(values, PERCENTILES, axis=0)
+        years = self.years
+        results = []
+        for i, scenario in enumerate(self.scenario_names):
+            df = pd.DataFrame({'jahr': years, 'szenario': scenario})
+            for j, percentile in enumerate(PERCENTILES):
+                df[f'p{percentile}'] = bands[j, i]
+            results.append(df)
+        self.ensemble_df = pd.concat(results, ignore_index=True)
+        return self.ensemble_df
+
+    def with_intervals(self, intervals_df: pd.DataFrame):
+        '''
+        Returns a shallow copy of the simulation working on other intervals, e.g. to evaluate
+        variants of a scenario in one batch. This instance is not changed.
+        '''
+        simulation = copy.copy(self)
+        simulation.intervals_df = intervals_df
+        simulation.factor_names = list(intervals_df['faktor'].unique())
+        simulation.scenario_names = list(intervals_df['szenario'].unique())
+        simulation._factor_table = None
+        simulation._factor_table_key = None
+        # variants are evaluated once, keeping checkpoints and histories of them is not worth the memory
+        simulation.checkpoints_enabled = False
+        simulation.history_enabled = False
+        return simulation
+
+    def with_variants(self, scenario, parameters: dict):
+        '''
+        Returns a copy of the simulation with one scenario per variant of a scenario, see
+        sim.intervals.expand_variants.
+        '''
+        return self.with_intervals(expand_variants(self.intervals_df, scenario, parameters))
+
+    def evaluate_variants(self, scenario, parameters: dict, seed=DEFAULT_SEED) -> np.ndarray:
+        '''
+        Simulates variants of a scenario in one batch, see sim.intervals.expand_variants.
+
+        Returns:
+            np.ndarray: target time series with shape (variants, years).
+        '''
+        return self.with_variants(scenario, parameters).simulate_fleet(seed)[self.target_time_series_name]
+
+    def sweep(self, grid: dict, scenario: str = 'M', chunk_size: int = 5000, seed=DEFAULT_SEED) -> pd.DataFrame:
+        '''
+        Evaluates all combinations of the parameter values in grid, based on the intervals of a scenario.
+
+        grid maps a parameter (see sim.intervals.parse_parameter) to the values to evaluate, e.g.
+        {'f2': range(8, 16), ('f3', 2030, 'wert_bis'): np.linspace(0.4, 1.0, 13)}. The combinations
+        are simulated in batches of chunk_size variants, all starting with the same initial fleet.
+
+        Returns:
+            pd.DataFrame: one row per combination with the parameter values, the target time series
+            in target_year and the first year in which target_value is reached (missing if never).
+        '''
+        combinations = np.array(list(itertools.product(*grid.values())), dtype=float).reshape(-1, len(grid))
+        years = self.years
+        target_values = []
+        first_years = []
+        for start in range(0, len(combinations), chunk_size):
+            chunk = combinations[start:start + chunk_size]
+            values = self.evaluate_variants(scenario, dict(zip(grid, chunk.T)), seed)
+            target_values.append(values[:, self.target_year - self.first_year])
+            reached = values >= self.target_value
+            first_years.append(np.where(reached.any(axis=1), years[reached.argmax(axis=1)], -1))
+
+        result = pd.DataFrame(combinations, columns=[parameter_name(parameter) for parameter in grid])
+        result[f'{self.target_time_series_name}_{self.target_year}'] = np.concatenate(target_values)
+        first_years = pd.Series(np.concatenate(first_years), dtype='Int64')
+        result['jahr_ziel_erreicht'] = first_years.mask(first_years < 0)
+        return result
+
+    def solve(self, parameter, lower: float, upper: float, scenario: str = 'M', tolerance: float = 1e-3,
+              points_per_step: int = 8, seed=DEFAULT_SEED) -> dict:
+        '''
+        Finds the value of a parameter (see sim.intervals.parse_parameter) between lower and upper at
+        which the target time series of a scenario just reaches target_value in target_year, e.g. the
+        constant share of emission free new registrations 'f3' needed in scenario M.
+
+        The search assumes that the result is monotonic in the parameter. It is a bracketed bisection
+        that evaluates points_per_step points per step in one batch, which shrinks the bracket by a
+        factor of points_per_step + 1. The value returned is the end of the final bracket that reaches
+        the target.
+
+        Returns:
+            dict: solved (False if the target is reached at both or none of the bounds), value,
+            evaluations (number of simulated variants), steps and trajectory, a DataFrame with the
+            factor and the target time series per year for the value found.
+        '''
+        year_pos = self.target_year - self.first_year
+
+        def evaluate(values):
+            return self.evaluate_variants(scenario, {parameter: values}, seed)[:, year_pos]
+
+        reached = evaluate([lower, upper]) >= self.target_value
+        evaluations = 2
+        steps = 0
+        if reached[0] == reached[1]:
+            return {'solved': False, 'value': None, 'evaluations': evaluations, 'steps': steps, 'trajectory': None}
+
+        value_missed, value_reached = (lower, upper) if reached[1] else (upper, lower)
+        while abs(value_reached - value_missed) > tolerance:
+            values = np.linspace(value_missed, value_reached, points_per_step + 2)[1:-1]
+            reached = evaluate(values) >= self.target_value
+            evaluations += len(values)
+            steps += 1
+            # monotonic: the points are ordered from the missing to the reaching end of the bracket
+            first = reached.argmax() if reached.any() else len(values)
+            if first < len(values):
+                value_reached = values[first]
+            if first > 0:
+                value_missed = values[first - 1]
+
+        simulation = self.with_variants(scenario, {parameter: [value_reached]})
+        factor = parse_parameter(parameter)[0]
+        trajectory = pd.DataFrame({
+            'jahr': self.years,
+            factor: simulation.get_factor_values([factor])[0, 0],
+            self.target_time_series_name: simulation.simulate_fleet(seed)[self.target_time_series_name][0],
+        })
+        return {
+            'solved': True,
+            'value': float(value_reached),
+            'evaluations': evaluations,
+            'steps': steps,
+            'trajectory': trajectory,
+        }
 
     def __repr__(self):
-        return f'CarSimulation({self.target})'
+        return f'{type(self).__name__}({self.target})'
     
-    def run(self):
+    def get_cache_key(self, seed) -> str:
+        '''
+        Returns the key of the result cache: a hash over the engine version, the simulation class,
+        the goal, the simulated years, its intervals, the base data of the start year and the seed.
+        '''
+        return content_key(
+            ENGINE_VERSION, type(self).__name__, self.target, self.first_year, self.last_year,
+            intervals_key(self.intervals_df), self.start_year, seed
+        )
+
+    @profiled('run', count_scenario_years)
+    def run(self, seed=DEFAULT_SEED) -> dict:
+        '''
+        Calculates the factors and base values and simulates the fleet turnover for all scenarios.
+
+        Results of runs with a seed are memoized in RESULT_CACHE: if the same inputs have
+        been simulated before or are being simulated in another thread, result_dict is taken
+        from the cache. With seed=None the initial fleet is drawn with fresh entropy and the
+        result is not cached. A goal without intervals (see has_intervals) is not simulated,
+        result_dict is empty.
+
+        Returns:
+            dict: result_dict, one DataFrame per scenario.
+        '''
+        if not self.has_intervals():
+            self.result_dict = {}
+            return self.result_dict
+
+        def compute():
+            self.result_dict = self.calc_factors()
+            self.predict_base_values()
+            self.run_turnover(seed)
+            return self.result_dict
+
+        if seed is None:
+            return compute()
+        self.result_dict = RESULT_CACHE.get_or_compute(self.get_cache_key(seed), compute)
+        return self.result_dict
+
+    def predict_base_values(self):
+        ...
+
+    def simulate_fleet(self, seed=None) -> dict:
         ...
+
+    def run_turnover(self, seed=None):
+        ...
+
+
+class FleetSize(Enum):
+    # the fleet of a year is the simulated fleet of the previous year multiplied by f1
+    GROWTH = 1
+    # the fleet of a year is filled up to the base values predicted with f1
+    BASE_VALUES = 2
+
+
+class FleetSimulation(BaseSimulation):
+    '''
+    Fleet turnover engine shared by all goals that track the share of emission free vehicles
+    in a vehicle fleet. A goal is declared by a subclass that sets the class attributes below;
+    the factors are always f1 (yearly change of the fleet size), f2 (age at which a vehicle is
+    replaced) and f3 (share of emission free vehicles among the new registrations).
+    '''
+    # Enum of the base data time series, members TS_TOTAL and TS_ELECTRIC are required
+    base_data = None
+    target_time_series = None
+    target_time_series_name = 'PCT_ELECTRIC'
+    # goal indicator: target value of the target time series in the target year
+    target_year = 2037
+    target_value = None
+    factor_descriptions = {}
+    yaxis_title = ''
+    # used for initializing the fleet: ages are drawn uniformly up to these limits
+    max_age_electric = 3
+    max_age_gas = 12
+    # with InitialAges.REGISTRY the ages are drawn from the vehicles of these classes in VEHICLE_AGES_FILE
+    initial_ages = InitialAges.UNIFORM
+    vehicle_classes = ()
+    fleet_size = FleetSize.GROWTH
+    # if the fleet is larger than its size for the year, the oldest vehicles are removed
+    remove_surplus = True
+    # the vehicles are counted at the beginning of the year, before ageing and new registrations
+    count_before_additions = False
+    input_files = [SCENARIO_INTERVALS_FILE, TIME_SERIES_FILE, VEHICLE_AGES_FILE]
+    # retirement of the vehicles of all scenarios, scenario_retirement maps scenarios to another mode
+    retirement = Retirement.AGE_LIMIT
+    scenario_retirement = {}
+    # shape of the Weibull survival curve of Retirement.SURVIVAL, the mean is f2
+    weibull_shape = 3.0
+
+    def __init__(self, target, profiler=None):
+        super().__init__(target, profiler)
+        self.data = self.get_data()
+        self.start_year = self.data[(self.data['jahr'] == self.first_year - 1)].iloc[0]
+        # vehicles per age and powertrain of the registry, None if there is no age distribution
+        self.age_histogram = self.get_age_histogram()
+        self.result_dict = self.get_factors()
+        self.cars = []
+        # keep per-year fleet states in FLEET_CHECKPOINTS, see simulate_fleet
+        self.checkpoints_enabled = True
+        # first simulation year actually simulated by the last call of simulate_fleet
+        self.resume_year = None
+        # record the fleet composition of every year in history, see sim.history.FleetHistory
+        self.history_enabled = True
+        self.history = None
+
+    def memory_usage(self) -> int:
+        size = super().memory_usage() + int(self.data.memory_usage(deep=True).sum())
+        if self.history is not None:
+            size += self.history.nbytes
+        return size
+
+    @profiled('get_data', lambda simulation, df: (len(df), None))
+    def get_data(self):
+        '''
+        Retrieves and processes data from a CSV file.
+
+        Returns:
+            result (DataFrame): Processed data in a DataFrame format.
+        '''
+        base_data_values = [int(member.value) for member in self.base_data]
+        df = DATA_STORE.read(self.data_file(TIME_SERIES_FILE), where={'ts_id': base_data_values})
+        df['ts_id'] = df['ts_id'].map(lambda x: self.base_data(x).name)
+        pivot_df = df.pivot(index='jahr', columns='ts_id', values='wert').reset_index()
+        result = self.calc_history(pivot_df)
+        return result
+
+    def get_age_histogram(self):
+        '''
+        Returns the number of vehicles of vehicle_classes per age and powertrain at the end of the
+        last year with base data, or of the latest earlier year in VEHICLE_AGES_FILE, as array with
+        shape (ages, powertrains). None if the goal has no vehicle classes or there are no vehicles.
+        '''
+        if not self.vehicle_classes:
+            return None
+        try:
+            df = DATA_STORE.read(self.data_file(VEHICLE_AGES_FILE), where={'klasse': list(self.vehicle_classes)})
+        except FileNotFoundError:
+            return None
+        counts = get_age_distribution(df, self.first_year - 1)
+        return counts if counts is not None and counts.sum() > 0 else None
+
+    def calc_history(self, df) -> pd.DataFrame:
+        '''
+        Calculates the historical share of emission free vehicles by dividing the number of
+        emission free vehicles (column TS_ELECTRIC) by the total number of vehicles (column TS_TOTAL).
+        The result is stored in the column of the target time series.
+        '''
+        df[self.target_time_series_name] = df['TS_ELECTRIC'] / df['TS_TOTAL']
+        return df
+
+    def calc_base_values(self) -> np.ndarray:
+        """
+        extrapolates the base values for the simulation period.
+
+        The base values of all scenarios are calculated at once: the value of a year is
+        the rounded value of the previous year multiplied by the factor 'f1'.
+
+        Returns:
+            np.ndarray: predicted totals with shape (scenarios, years).
+        """
+        f1 = self.get_factor_values(['f1'])[0]
+        totals = np.empty_like(f1)
+        totals[:, 0] = self.start_year['TS_TOTAL']
+        for i in range(1, f1.shape[1]):
+            totals[:, i] = np.rint(totals[:, i - 1] * f1[:, i])
+        return totals
+
+    @profiled('predict_base_values', count_scenario_years)
+    def predict_base_values(self):
+        """
+        writes the extrapolated base values to result_dict.
+        """
+        totals = self.calc_base_values()
+        for i, scenario in enumerate(self.scenario_names):
+            self.result_dict[scenario]['TS_TOTAL'] = totals[i]
+
+    def get_retirement(self, scenario) -> Retirement:
+        return self.scenario_retirement.get(scenario, self.retirement)
+
+    def get_survival_scenarios(self) -> np.ndarray:
+        '''
+        Returns a bool array with one value per scenario, True for Retirement.SURVIVAL.
+        '''
+        return np.array([self.get_retirement(scenario) == Retirement.SURVIVAL for scenario in self.scenario_names],
+                        dtype=bool)
+
+    def with_variants(self, scenario, parameters: dict):
+        simulation = super().with_variants(scenario, parameters)
+        # the variants are retired like the scenario they are derived from
+        simulation.scenario_retirement = dict.fromkeys(simulation.scenario_names, self.get_retirement(scenario))
+        return simulation
+
+    def get_retirement_key(self) -> tuple:
+        return tuple(self.get_retirement(scenario).name for scenario in self.scenario_names), self.weibull_shape
+
+    def uses_registry_ages(self) -> bool:
+        return self.initial_ages == InitialAges.REGISTRY and self.age_histogram is not None
+
+    def get_initial_ages_key(self) -> tuple:
+        if self.uses_registry_ages():
+            return InitialAges.REGISTRY.name, self.age_histogram.tolist()
+        return (InitialAges.UNIFORM.name,)
+
+    def get_cache_key(self, seed) -> str:
+        return content_key(super().get_cache_key(seed), self.get_retirement_key(), self.get_initial_ages_key())
+
+    @profiled('init_cars', lambda simulation, cars: (None, int(cars.total.sum())))
+    def init_cars(self, rng=None) -> Fleet:
+        '''
+        Draws the initial fleet. With Retirement.AGE_LIMIT the ages are uniform up to max_age_gas and
+        max_age_electric, the same fleet for all scenarios. With Retirement.SURVIVAL the ages of the gas
+        vehicles follow the stationary age distribution of the survival curve with the mean age f2 of
+        the first year of the scenario. The emission free fleet is young and still growing, its ages
+        remain uniform up to max_age_electric.
+
+        With InitialAges.REGISTRY and an age histogram of the registry, the ages of both powertrains
+        are drawn from the histogram instead, the same fleet for all scenarios. The numbers of
+        vehicles remain those of the base data.
+        '''
+        rng = np.random.default_rng() if rng is None else rng
+        num_electric_start = int(self.start_year['TS_ELECTRIC'])
+        num_non_electric_start = int(self.start_year['TS_TOTAL'] - num_electric_start)
+        # enough age classes so that scrapping at the highest replacement age never needs to grow the fleet
+        f2 = self.get_factor_values(['f2'])[0]
+        # years without an interval are NaN, if f2 has no value at all there is no replacement age
+        max_age_limit = math.ceil(np.nanmax(f2)) if np.isfinite(f2).any() else self.max_age_gas
+        num_age_classes = max(self.max_age_gas, max_age_limit) + 2
+        survival_scenarios = self.get_survival_scenarios()
+        if np.isfinite(f2[survival_scenarios]).any():
+            num_age_classes = max(num_age_classes, oldest_age(f2[survival_scenarios], self.weibull_shape) + 1)
+        if self.uses_registry_ages():
+            return self.init_registry_cars(num_electric_start, num_non_electric_start, num_age_classes, rng)
+        cars = Fleet.from_uniform_ages(
+            num_electric_start, num_non_electric_start, self.max_age_electric, self.max_age_gas, num_age_classes, rng,
+            num_scenarios=len(self.scenario_names)
+        )
+        # without a mean age in the first year the survival scenarios keep the uniform ages
+        stationary_scenarios = survival_scenarios & np.isfinite(f2[:, 0])
+        if stationary_scenarios.any():
+            p_gas = stationary_age_distribution(cars.num_age_classes, f2[stationary_scenarios, 0], self.weibull_shape)
+            p_electric = np.zeros_like(p_gas)
+            p_electric[:, :self.max_age_electric + 1] = 1 / (self.max_age_electric + 1)
+            drawn = Fleet.from_age_distribution(num_electric_start, num_non_electric_start, p_electric, p_gas, rng)
+            cars.counts[stationary_scenarios] = drawn.counts
+        return cars
+
+    def init_registry_cars(self, num_electric: int, num_gas: int, num_age_classes: int, rng) -> Fleet:
+        '''
+        Draws the initial fleet from the shares of the age classes in age_histogram, the same fleet
+        for all scenarios. A powertrain without registered vehicles keeps the uniform ages.
+        '''
+        num_age_classes = max(num_age_classes, self.age_histogram.shape[0] + 1)
+        p = np.zeros((len(Powertrain), num_age_classes))
+        p[:, :self.age_histogram.shape[0]] = self.age_histogram.T
+        for powertrain, max_age in ((Powertrain.ELECTRIC, self.max_age_electric), (Powertrain.GAS, self.max_age_gas)):
+            if p[powertrain.value].sum() == 0:
+                p[powertrain.value, :max_age + 1] = 1
+        p /= p.sum(axis=1, keepdims=True)
+        drawn = Fleet.from_age_distribution(
+            num_electric, num_gas, p[[Powertrain.ELECTRIC.value]], p[[Powertrain.GAS.value]], rng
+        )
+        return Fleet(np.repeat(drawn.counts, len(self.scenario_names), axis=0))
+
+    def retire(self, cars: Fleet, mean_age: np.ndarray, survival_scenarios: np.ndarray, rng) -> np.ndarray:
+        '''
+        Removes the vehicles retired at the beginning of a year: with Retirement.AGE_LIMIT all
+        vehicles with age >= mean_age, with Retirement.SURVIVAL a random number per age class
+        following the survival curve.
+
+        Returns:
+            np.ndarray: number of vehicles removed per scenario.
+        '''
+        if not survival_scenarios.any():
+            return cars.scrap(mean_age)
+        probabilities = retirement_probabilities(cars.num_age_classes, mean_age, self.weibull_shape)
+        age_limit = np.arange(cars.num_age_classes) >= np.ceil(mean_age)[:, np.newaxis]
+        return cars.retire(np.where(survival_scenarios[:, np.newaxis], probabilities, age_limit), rng)
+
+    def get_resume_index(self, factors: np.ndarray, seed) -> tuple:
+        '''
+        Compares the factors with those of the checkpointed simulation and returns the index of
+        the first year with a difference in any scenario, i.e. the year from which the simulation
+        must be repeated, and the checkpoints compared with. The simulation must resume from
+        these checkpoints: another thread may replace the entry in FLEET_CHECKPOINTS meanwhile.
+
+        Returns:
+            tuple: index and checkpoints. The index is 0 if the checkpoints cannot be used (they
+            may be None then) and the number of years if nothing has changed.
+        '''
+        if not self.checkpoints_enabled:
+            return 0, None
+        with FLEET_CHECKPOINTS_LOCK:
+            checkpoints = FLEET_CHECKPOINTS.get((type(self).__name__, self.target))
+        if (
+            checkpoints is None
+            or seed is None
+            or checkpoints['seed'] != seed
+            or checkpoints['scenario_names'] != self.scenario_names
+            or checkpoints['factors'].shape != factors.shape
+            or not checkpoints['start_year'].equals(self.start_year)
+            or checkpoints['retirement'] != self.get_retirement_key()
+            or checkpoints['initial_ages'] != self.get_initial_ages_key()
+            or (self.history_enabled and checkpoints['history'] is None)
+        ):
+            return 0, checkpoints
+        previous = checkpoints['factors']
+        changed = (previous != factors) & ~(np.isnan(previous) & np.isnan(factors))
+        changed_years = changed.any(axis=(0, 1))
+        return (int(changed_years.argmax()) if changed_years.any() else factors.shape[2]), checkpoints
+
+    @profiled('simulate_fleet', lambda simulation, series: (
+        len(simulation.scenario_names) * (simulation.last_year + 1 - simulation.resume_year),
+        int(series['TS_TOTAL'][:, -1].sum()),
+    ))
+    def simulate_fleet(self, seed=None) -> dict:
+        '''
+        Simulates the fleet turnover, starting from a newly drawn initial fleet. All scenarios
+        are simulated in one pass with the scenario as first array axis. This is the only
+        random part of a run: the initial fleet and, with Retirement.SURVIVAL, the retirements.
+
+        The fleet state at the beginning of every year is kept as checkpoint. If the factors of
+        a later call with the same seed differ only from a certain year on, e.g. after editing
+        an interval, the simulation resumes from the checkpoint of that year. With history_enabled
+        the composition of the fleet and the flows of every year are kept in history.
+
+        Returns:
+            dict: simulated time series TS_ELECTRIC, TS_TOTAL and the target time series,
+            each an array with shape (scenarios, years).
+        '''
+        factors = self.get_factor_values(['f1', 'f2', 'f3'])
+        f1, f2, f3 = factors
+        num_years = f1.shape[1]
+        base_values = self.calc_base_values() if self.fleet_size == FleetSize.BASE_VALUES else None
+        survival_scenarios = self.get_survival_scenarios()
+        start, checkpoints = self.get_resume_index(factors, seed)
+        if start > 0:
+            self.cars = checkpoints['initial_fleet']
+            states = checkpoints['states'][:start] + [None] * (num_years - start)
+            rng_states = checkpoints['rng_states'][:start] + [None] * (num_years - start)
+            num_electric = checkpoints['num_electric'].copy()
+            num_total = checkpoints['num_total'].copy()
+            cars = Fleet(checkpoints['states'][start].copy()) if start < num_years else None
+            history = checkpoints['history'].copy() if self.history_enabled else None
+            rng = np.random.default_rng()
+            if start < num_years:
+                rng.bit_generator.state = checkpoints['rng_states'][start]
+        else:
+            rng = np.random.default_rng(seed)
+            self.cars = self.init_cars(rng)
+            cars = self.cars.copy()
+            states = [None] * num_years
+            rng_states = [None] * num_years
+            history = FleetHistory(self.years, self.scenario_names, cars.num_age_classes) if self.history_enabled else None
+            num_electric = np.zeros(f1.shape, dtype=np.int64)
+            num_total = np.zeros(f1.shape, dtype=np.int64)
+        self.resume_year = self.first_year + start
+
+        for i in range(start, num_years):
+            states[i] = cars.counts.copy()
+            rng_states[i] = rng.bit_generator.state
+            if self.fleet_size == FleetSize.GROWTH:
+                new_car_num = np.rint(cars.total * f1[:, i]).astype(np.int64)
+            else:
+                new_car_num = base_values[:, i].astype(np.int64)
+            # remove cars older than age_limit or retired following the survival curve
+            self.retire(cars, f2[:, i], survival_scenarios, rng)
+            if history is not None:
+                retired = states[i] - cars.counts
+            to_replace = new_car_num - cars.total
+            # after an increase in car age cobined with a decline in predicted cars, the number of cars to be replaced
+            # is negative and the oldest cars need to be removed
+            if self.remove_surplus:
+                cars.remove_oldest(np.maximum(-to_replace, 0))
+            if history is not None:
+                removed = states[i] - cars.counts - retired
+            to_replace = np.maximum(to_replace, 0)
+            # Number of electric and gas cars added
+            electric_added = np.rint(to_replace * f3[:, i]).astype(np.int64)
+            gas_added = to_replace - electric_added
+            if self.count_before_additions:
+                num_electric[:, i] = cars.electric
+                num_total[:, i] = cars.total
+
+            # Increment age for each remaining car and add the new registrations
+            cars.age()
+            cars.add(electric_added, gas_added)
+            if not self.count_before_additions:
+                num_electric[:, i] = cars.electric
+                num_total[:, i] = cars.total
+            if history is not None:
+                history.record(i, cars.counts, retired, removed, electric_added, gas_added)
+        self.history = history
+
+        if self.checkpoints_enabled and seed is not None:
+            checkpoints = {
+                'seed': seed,
+                'initial_fleet': self.cars,
+                'scenario_names': list(self.scenario_names),
+                'start_year': self.start_year,
+                'retirement': self.get_retirement_key(),
+                'initial_ages': self.get_initial_ages_key(),
+                'factors': factors.copy(),
+                'states': states,
+                'rng_states': rng_states,
+                'history': history,
+                'num_electric': num_electric,
+                'num_total': num_total,
+            }
+            with FLEET_CHECKPOINTS_LOCK:
+                FLEET_CHECKPOINTS[(type(self).__name__, self.target)] = checkpoints
+        totals = base_values if self.fleet_size == FleetSize.BASE_VALUES else num_total
+        return {
+            'TS_ELECTRIC': num_electric,
+            'TS_TOTAL': totals,
+            self.target_time_series_name: 100 * num_electric / totals,
+        }
+
+    def get_history(self, seed=DEFAULT_SEED) -> FleetHistory:
+        '''
+        Returns the fleet composition of every year and scenario for the current factors, taken
+        from the checkpoints of the last simulation or, if the factors have changed since, simulated
+        again from the first changed year.
+        '''
+        self.simulate_fleet(seed)
+        return self.history
+
+    def run_turnover(self, seed=None):
+        '''
+        Runs simulate_fleet and writes the simulated time series to result_dict.
+        '''
+        series = self.simulate_fleet(seed)
+        for i, scenario in enumerate(self.scenario_names):
+            values = self.result_dict[scenario]
+            for name in ['TS_ELECTRIC', 'TS_TOTAL', self.target_time_series_name]:
+                values[name] = series[name][i]
+
+    def get_plot(self):
+        # imported here, so that simulations can run without the plotting and UI dependencies
+        from plots import line_chart, add_bands
+
+        settings = {
+            'x': 'jahr',
+            'y': self.target_time_series_name,
+            'color': 'szenario',
+            'xaxis_title': 'Jahr',
+            'yaxis_title': self.yaxis_title,
+            'color_name': 'Szenario',
+            'h_line': self.target_value,
+        }
+        results = []
+        for scenario in self.scenario_names:
+            df = self.result_dict[scenario].copy().reset_index()
+            df = df[['jahr', self.target_time_series_name]]
+            df['szenario'] = scenario
+            results.append(df)
+        plot_df = pd.concat(results)
+        fig = line_chart(plot_df, settings)
+        if self.ensemble_df is not None:
+            settings.update({'lower': 'p5', 'upper': 'p95'})
+            add_bands(fig, self.ensemble_df, settings)
+            plot_df = plot_df.merge(self.ensemble_df, on=['jahr', 'szenario'], how='left')
+        return fig, plot_df
@@ -0,0 +1,113 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def content_key(*parts) -> str:
+    '''
+    Returns a hash over the content of all parts. DataFrames and Series are hashed by their
+    values and index, everything else by its repr.
+    '''
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        else:
+            digest.update(repr(part).encode('utf-8'))
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+class ResultCache():
+    '''
+    Size-bounded cache of simulation results with least-recently-used eviction, shared by all
+    sessions of the process.
+
+    A result is a dict of DataFrames (see BaseSimulation.result_dict). The cache stores and
+    hands out copies, so callers can modify the returned frames.
+
+    Results computed with get_or_compute are computed only once: callers asking for a key whose
+    result is being computed wait for it instead of computing it again.
+    '''
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        '''
+        Returns a copy of the cached result or None if the key is unknown.
+        '''
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            result = self._entries[key]
+        return {name: df.copy() for name, df in result.items()}
+
+    def get_or_compute(self, key: str, compute) -> dict:
+        '''
+        Returns a copy of the cached result, or computes it with compute() and caches it. If the
+        result is being computed in another thread, waits for it; if that computation fails, the
+        result is computed again.
+        '''
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    result = self._entries[key]
+                    return {name: df.copy() for name, df in result.items()}
+                in_flight = self._in_flight.get(key)
+                if in_flight is None:
+                    self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.waits += 1
+            in_flight.wait()
+        try:
+            result = compute()
+            self.put(key, result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key).set()
+
+    def put(self, key: str, result: dict):
+        result = {name: df.copy() for name, df in result.items()}
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+            self.waits = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits,
+                'hit_rate': self.hits / requests if requests else 0.0,
+            }
+
+
+RESULT_CACHE = ResultCache()
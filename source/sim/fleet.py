@@ -0,0 +1,136 @@
+from enum import Enum
+
+import numpy as np
+
+
+class Powertrain(Enum):
+    GAS = 0
+    ELECTRIC = 1
+
+
+class Fleet():
+    '''
+    Vehicle fleets of several scenarios held as histograms of vehicle counts per age class
+    and powertrain.
+
+    counts[scenario, age, powertrain] is the number of vehicles of the given age (in years) and
+    powertrain. Ageing, scrapping and adding new registrations are array shifts and slices over
+    all scenarios at once, so runtime and memory depend on the number of scenarios and age
+    classes, not on the number of vehicles. Arguments and results of the methods are arrays
+    with one value per scenario.
+    '''
+
+    def __init__(self, counts):
+        self.counts = np.asarray(counts, dtype=np.int64)
+
+    @classmethod
+    def from_uniform_ages(cls, num_electric: int, num_gas: int, max_age_electric: int,
+                          max_age_gas: int, num_age_classes: int, rng=None, num_scenarios: int = 1):
+        '''
+        Builds a fleet where the age of every vehicle is drawn uniformly from
+        0..max_age of its powertrain. All scenarios start with the same fleet.
+
+        Returns:
+            Fleet: the initial fleet with num_age_classes age classes.
+        '''
+        rng = np.random.default_rng() if rng is None else rng
+        num_age_classes = max(num_age_classes, max_age_electric + 2, max_age_gas + 2)
+        counts = np.zeros((num_age_classes, len(Powertrain)), dtype=np.int64)
+        for powertrain, num, max_age in [
+            (Powertrain.ELECTRIC, num_electric, max_age_electric),
+            (Powertrain.GAS, num_gas, max_age_gas),
+        ]:
+            p = np.full(max_age + 1, 1 / (max_age + 1))
+            counts[:max_age + 1, powertrain.value] = rng.multinomial(num, p)
+        return cls(np.repeat(counts[np.newaxis], num_scenarios, axis=0))
+
+    @classmethod
+    def from_age_distribution(cls, num_electric: int, num_gas: int, p_electric, p_gas, rng=None):
+        '''
+        Builds a fleet where the ages are drawn from a distribution per scenario, given as
+        arrays with shape (scenarios, ages) of the share of every age class.
+        '''
+        rng = np.random.default_rng() if rng is None else rng
+        p_electric = np.asarray(p_electric, dtype=float)
+        counts = np.zeros(p_electric.shape + (len(Powertrain),), dtype=np.int64)
+        counts[:, :, Powertrain.ELECTRIC.value] = rng.multinomial(num_electric, p_electric)
+        counts[:, :, Powertrain.GAS.value] = rng.multinomial(num_gas, p_gas)
+        return cls(counts)
+
+    def copy(self):
+        return Fleet(self.counts.copy())
+
+    @property
+    def num_age_classes(self) -> int:
+        return self.counts.shape[1]
+
+    @property
+    def total(self) -> np.ndarray:
+        return self.counts.sum(axis=(1, 2))
+
+    @property
+    def electric(self) -> np.ndarray:
+        return self.counts[:, :, Powertrain.ELECTRIC.value].sum(axis=1)
+
+    @property
+    def gas(self) -> np.ndarray:
+        return self.counts[:, :, Powertrain.GAS.value].sum(axis=1)
+
+    def scrap(self, age_limit) -> np.ndarray:
+        '''
+        Removes all vehicles with age >= age_limit.
+
+        Returns:
+            np.ndarray: number of vehicles removed per scenario.
+        '''
+        first_age = np.maximum(np.ceil(np.asarray(age_limit, dtype=float)), 0)
+        scrapped = np.arange(self.num_age_classes) >= np.reshape(first_age, (-1, 1))
+        removed = (self.counts * scrapped[:, :, np.newaxis]).sum(axis=(1, 2))
+        self.counts[scrapped] = 0
+        return removed
+
+    def retire(self, probabilities, rng) -> np.ndarray:
+        '''
+        Removes every vehicle with the retirement probability of its scenario and age class,
+        given as array with shape (scenarios, ages). The number removed per age class and
+        powertrain is drawn from a binomial distribution.
+
+        Returns:
+            np.ndarray: number of vehicles removed per scenario.
+        '''
+        retired = rng.binomial(self.counts, np.asarray(probabilities)[:, :, np.newaxis])
+        self.counts -= retired
+        return retired.sum(axis=(1, 2))
+
+    def remove_oldest(self, num):
+        '''
+        Removes num vehicles starting with the oldest age class. Within the age class
+        where the removal stops, vehicles are removed proportionally to the powertrain mix.
+        '''
+        per_age = self.counts.sum(axis=2)
+        # vehicles in all strictly older age classes
+        older = np.cumsum(per_age[:, ::-1], axis=1)[:, ::-1] - per_age
+        removed = np.clip(np.reshape(num, (-1, 1)) - older, 0, per_age)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(per_age > 0, self.counts[:, :, Powertrain.ELECTRIC.value] / per_age, 0)
+        removed_electric = np.rint(removed * share).astype(np.int64)
+        self.counts[:, :, Powertrain.ELECTRIC.value] -= removed_electric
+        self.counts[:, :, Powertrain.GAS.value] -= removed - removed_electric
+
+    def age(self):
+        '''
+        Moves every vehicle to the next age class. The histogram is extended if the
+        oldest class is occupied.
+        '''
+        if self.counts[:, -1].any():
+            extension = np.zeros((self.counts.shape[0], 1, len(Powertrain)), dtype=np.int64)
+            self.counts = np.concatenate([self.counts, extension], axis=1)
+        self.counts[:, 1:] = self.counts[:, :-1]
+        self.counts[:, 0] = 0
+
+    def add(self, num_electric, num_gas):
+        '''
+        Adds new registrations to age class 0.
+        '''
+        self.counts[:, 0, Powertrain.ELECTRIC.value] += num_electric
+        self.counts[:, 0, Powertrain.GAS.value] += num_gas
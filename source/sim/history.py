@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from sim.fleet import Powertrain
+
+COUNT_DTYPE = np.int32
+
+
+class FleetHistory():
+    '''
+    Fleet composition of every simulated year and scenario by age class and powertrain, and the
+    flows that lead to it, recorded by FleetSimulation.simulate_fleet.
+
+    All arrays have the year as first axis and hold vehicle counts as int32, so the memory depends
+    on years x scenarios x age classes and not on the number of vehicles:
+        counts[year, scenario, age, powertrain]: fleet at the end of the year, after the new registrations
+        retired[year, scenario, age, powertrain]: vehicles retired (age limit or survival curve)
+        removed[year, scenario, age, powertrain]: surplus vehicles removed when the fleet shrinks
+        added[year, scenario, powertrain]: new registrations
+    Ages of retired and removed vehicles are those at the beginning of the year, ages in counts
+    those at the end of the year.
+    '''
+
+    def __init__(self, years, scenario_names: list, num_age_classes: int):
+        self.years = np.asarray(years)
+        self.scenario_names = list(scenario_names)
+        shape = (len(self.years), len(self.scenario_names), num_age_classes, len(Powertrain))
+        self.counts = np.zeros(shape, dtype=COUNT_DTYPE)
+        self.retired = np.zeros(shape, dtype=COUNT_DTYPE)
+        self.removed = np.zeros(shape, dtype=COUNT_DTYPE)
+        self.added = np.zeros((len(self.years), len(self.scenario_names), len(Powertrain)), dtype=COUNT_DTYPE)
+
+    @property
+    def num_age_classes(self) -> int:
+        return self.counts.shape[2]
+
+    @property
+    def nbytes(self) -> int:
+        return self.counts.nbytes + self.retired.nbytes + self.removed.nbytes + self.added.nbytes
+
+    def copy(self):
+        history = FleetHistory(self.years, self.scenario_names, self.num_age_classes)
+        for name in ['counts', 'retired', 'removed', 'added']:
+            setattr(history, name, getattr(self, name).copy())
+        return history
+
+    def _grow(self, num_age_classes: int):
+        if num_age_classes <= self.num_age_classes:
+            return
+        padding = ((0, 0), (0, 0), (0, num_age_classes - self.num_age_classes), (0, 0))
+        for name in ['counts', 'retired', 'removed']:
+            setattr(self, name, np.pad(getattr(self, name), padding))
+
+    def _pad(self, values: np.ndarray) -> np.ndarray:
+        return np.pad(values, ((0, 0), (0, self.num_age_classes - values.shape[1]), (0, 0)))
+
+    def record(self, year_index: int, counts, retired, removed, added_electric, added_gas):
+        '''
+        Stores the fleet at the end of a year and the flows of the year, the age arrays with
+        shape (scenarios, ages, powertrains) and the additions with one value per scenario.
+        '''
+        self._grow(max(counts.shape[1], retired.shape[1], removed.shape[1]))
+        self.counts[year_index] = self._pad(counts)
+        self.retired[year_index] = self._pad(retired)
+        self.removed[year_index] = self._pad(removed)
+        self.added[year_index, :, Powertrain.ELECTRIC.value] = added_electric
+        self.added[year_index, :, Powertrain.GAS.value] = added_gas
+
+    def year_index(self, year: int) -> int:
+        positions = np.flatnonzero(self.years == year)
+        if len(positions) == 0:
+            raise ValueError(f'year {year} is not simulated ({self.years[0]}-{self.years[-1]})')
+        return int(positions[0])
+
+    def scenario_index(self, scenario) -> int:
+        if scenario not in self.scenario_names:
+            raise ValueError(f'unknown scenario {scenario}, scenarios are {self.scenario_names}')
+        return self.scenario_names.index(scenario)
+
+    def age_pyramid(self, year: int, scenario) -> pd.DataFrame:
+        '''
+        Returns the fleet at the end of a year by age, index alter and one column per powertrain.
+        '''
+        counts = self.counts[self.year_index(year), self.scenario_index(scenario)]
+        return self._by_age(counts)
+
+    def retirements_by_age(self, year: int, scenario) -> pd.DataFrame:
+        '''
+        Returns the vehicles retired or removed in a year by age, index alter and one column per powertrain.
+        '''
+        i, j = self.year_index(year), self.scenario_index(scenario)
+        return self._by_age(self.retired[i, j] + self.removed[i, j])
+
+    def _by_age(self, counts: np.ndarray) -> pd.DataFrame:
+        df = pd.DataFrame(
+            {powertrain.name: counts[:, powertrain.value] for powertrain in Powertrain},
+            index=pd.Index(np.arange(len(counts)), name='alter'),
+        )
+        # age classes beyond the oldest vehicle
+        occupied = np.flatnonzero(counts.sum(axis=1))
+        return df.iloc[:occupied[-1] + 1] if len(occupied) else df.iloc[:0]
+
+    def _per_year(self, values: np.ndarray, scenario=None) -> pd.DataFrame:
+        '''
+        values with shape (years, scenarios, powertrains) as DataFrame with columns jahr,
+        szenario and one column per powertrain, for one or all scenarios.
+        '''
+        scenario_indices = range(len(self.scenario_names)) if scenario is None else [self.scenario_index(scenario)]
+        frames = []
+        for j in scenario_indices:
+            df = pd.DataFrame({'jahr': self.years, 'szenario': self.scenario_names[j]})
+            for powertrain in Powertrain:
+                df[powertrain.name] = values[:, j, powertrain.value]
+            frames.append(df)
+        return pd.concat(frames, ignore_index=True)
+
+    def retirements(self, scenario=None) -> pd.DataFrame:
+        '''
+        Vehicles retired or removed per year by powertrain.
+        '''
+        return self._per_year((self.retired + self.removed).sum(axis=2), scenario)
+
+    def additions(self, scenario=None) -> pd.DataFrame:
+        '''
+        New registrations per year by powertrain.
+        '''
+        return self._per_year(self.added, scenario)
+
+    def composition(self, scenario=None) -> pd.DataFrame:
+        '''
+        Fleet at the end of every year by powertrain.
+        '''
+        return self._per_year(self.counts.sum(axis=2), scenario)
+
+    def mean_age(self, scenario=None) -> pd.DataFrame:
+        '''
+        Mean age of the fleet at the end of every year by powertrain.
+        '''
+        ages = np.arange(self.num_age_classes)[np.newaxis, np.newaxis, :, np.newaxis]
+        totals = self.counts.sum(axis=2)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            values = (self.counts * ages).sum(axis=2) / totals
+        return self._per_year(values, scenario)
@@ -0,0 +1,153 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+class FactorTable():
+    '''
+    Piecewise-linear factor table compiled from the rows of scenario_intervals.csv of one goal.
+
+    Every row (szenario, faktor, jahr_von, jahr_bis, wert_von, wert_bis) is a linear segment;
+    jahr_von = 0 means the segment starts with the first simulation year. All segments are
+    evaluated for all years in one vectorized pass. Where segments overlap, the row that comes
+    later in the file wins, years without any segment are NaN.
+
+    Attributes:
+        values (np.ndarray): factor values with shape (scenarios, factors, years).
+        issues (pd.DataFrame): gaps and overlaps, columns szenario, faktor, jahr_von, jahr_bis, typ.
+            Collected on first access.
+    '''
+
+    def __init__(self, intervals_df: pd.DataFrame, start_year: int, end_year: int):
+        self.scenario_names = list(intervals_df['szenario'].unique())
+        self.factor_names = list(intervals_df['faktor'].unique())
+        self.years = np.arange(start_year, end_year + 1)
+
+        scenario_idx = pd.Index(self.scenario_names).get_indexer(intervals_df['szenario'])
+        factor_idx = pd.Index(self.factor_names).get_indexer(intervals_df['faktor'])
+        series_idx = scenario_idx * len(self.factor_names) + factor_idx
+        year_from = intervals_df['jahr_von'].to_numpy(dtype=np.int64)
+        year_from = np.where(year_from > 0, year_from, start_year)
+        year_to = intervals_df['jahr_bis'].to_numpy(dtype=np.int64)
+        value_from = intervals_df['wert_von'].to_numpy(dtype=float)
+        value_to = intervals_df['wert_bis'].to_numpy(dtype=float)
+        duration = year_to - year_from
+        slope = np.divide(value_to - value_from, duration, out=np.zeros(len(duration)), where=duration != 0)
+
+        # rows x years
+        covered = (self.years >= year_from[:, None]) & (self.years <= year_to[:, None])
+        segment_values = value_from[:, None] + (self.years - year_from[:, None]) * slope[:, None]
+
+        num_series = len(self.scenario_names) * len(self.factor_names)
+        rows, year_pos = np.nonzero(covered)
+        last_row = np.full((num_series, len(self.years)), -1)
+        np.maximum.at(last_row, (series_idx[rows], year_pos), rows)
+        coverage = np.zeros((num_series, len(self.years)), dtype=np.int64)
+        np.add.at(coverage, (series_idx[rows], year_pos), 1)
+
+        values = np.full((num_series, len(self.years)), np.nan)
+        has_value = last_row >= 0
+        values[has_value] = segment_values[last_row[has_value], np.nonzero(has_value)[1]]
+        self.values = values.reshape(len(self.scenario_names), len(self.factor_names), len(self.years))
+        self.coverage = coverage
+        self._issues = None
+
+    @property
+    def issues(self) -> pd.DataFrame:
+        if self._issues is None:
+            self._issues = self.find_issues()
+        return self._issues
+
+    def find_issues(self) -> pd.DataFrame:
+        '''
+        Collects the year ranges without any interval (gap) or with more than one interval
+        (overlap) for every scenario and factor.
+        '''
+        issues = []
+        for series, counts in enumerate(self.coverage):
+            scenario = self.scenario_names[series // len(self.factor_names)]
+            factor = self.factor_names[series % len(self.factor_names)]
+            for issue_type, mask in [('gap', counts == 0), ('overlap', counts > 1)]:
+                # start and end positions of the runs of True values
+                edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+                for start, end in zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)):
+                    issues.append({
+                        'szenario': scenario,
+                        'faktor': factor,
+                        'jahr_von': int(self.years[start]),
+                        'jahr_bis': int(self.years[end - 1]),
+                        'typ': issue_type,
+                    })
+        return pd.DataFrame(issues, columns=['szenario', 'faktor', 'jahr_von', 'jahr_bis', 'typ'])
+
+    def to_frames(self) -> dict:
+        '''
+        Returns a dict with one DataFrame per scenario, index jahr and one column per factor.
+        '''
+        my_scenarios = {}
+        for i, scenario in enumerate(self.scenario_names):
+            df = pd.DataFrame(self.values[i].T.copy(), columns=self.factor_names, index=pd.Index(self.years, name='jahr'))
+            my_scenarios[scenario] = df
+        return my_scenarios
+
+
+def intervals_key(intervals_df: pd.DataFrame) -> str:
+    '''
+    Content hash of the interval rows including their order, used to detect changes of the intervals.
+    '''
+    row_hashes = pd.util.hash_pandas_object(intervals_df, index=False).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()
+
+
+def parse_parameter(parameter):
+    '''
+    A parameter addresses interval endpoints of one factor and is either
+    - a factor name, e.g. 'f2': wert_von and wert_bis of all intervals of the factor, which
+      makes the factor constant, or
+    - a tuple (factor, jahr_bis, column), e.g. ('f3', 2030, 'wert_bis'): one endpoint of the
+      interval of the factor ending in jahr_bis.
+
+    Returns:
+        tuple: factor, jahr_bis (None for all intervals) and the list of columns.
+    '''
+    if isinstance(parameter, str):
+        return parameter, None, ['wert_von', 'wert_bis']
+    factor, year_to, column = parameter
+    if column not in ('wert_von', 'wert_bis'):
+        raise ValueError(f'column of parameter {parameter} must be wert_von or wert_bis')
+    return factor, year_to, [column]
+
+
+def parameter_name(parameter) -> str:
+    if isinstance(parameter, str):
+        return parameter
+    return '_'.join(str(part) for part in parameter)
+
+
+def expand_variants(intervals_df: pd.DataFrame, scenario, parameters: dict) -> pd.DataFrame:
+    '''
+    Builds intervals with one scenario per variant from the intervals of the given scenario.
+
+    parameters maps a parameter (see parse_parameter) to an array with one value per variant.
+    The scenarios of the result are named 0..number of variants - 1.
+    '''
+    base = intervals_df[intervals_df['szenario'] == scenario]
+    if len(base) == 0:
+        raise ValueError(f'scenario {scenario} has no intervals')
+    num_variants = len(next(iter(parameters.values())))
+    columns = {column: np.tile(base[column].to_numpy(), num_variants) for column in base.columns}
+    columns['szenario'] = np.repeat(np.arange(num_variants), len(base))
+    for column in ['wert_von', 'wert_bis']:
+        columns[column] = columns[column].astype(float)
+    for parameter, values in parameters.items():
+        factor, year_to, parameter_columns = parse_parameter(parameter)
+        rows = (base['faktor'] == factor).to_numpy()
+        if year_to is not None:
+            rows &= (base['jahr_bis'] == year_to).to_numpy()
+        if not rows.any():
+            raise ValueError(f'no interval of scenario {scenario} matches parameter {parameter}')
+        mask = np.tile(rows, num_variants)
+        for column in parameter_columns:
+            columns[column][mask] = np.repeat(np.asarray(values, dtype=float), rows.sum())
+    return pd.DataFrame(columns)
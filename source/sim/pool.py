@@ -0,0 +1,113 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+from sim.registry import SIM_DICT
+
+# memory budget of the pool, can be set with the environment variable KSS_SIMULATION_POOL_MB
+POOL_MAX_BYTES = int(os.environ.get('KSS_SIMULATION_POOL_MB', 256)) * 2 ** 20
+
+
+class SimulationPool():
+    '''
+    Process-wide pool of simulations, keyed by goal and version of the input files and saved results
+    of the goal, shared by all sessions and reruns of the app.
+
+    A simulation is built from the files only once per input version. get hands out shallow copies
+    of the pooled simulation: the copies share the data read from the files but every session can
+    change its own copy (edited intervals, results of a new run, settings) without affecting other
+    sessions. The pooled simulations themselves are only read, so all of them are idle and are evicted
+    in least-recently-used order as soon as the estimated memory exceeds max_bytes. A simulation of
+    an older input version of a goal is dropped when the new version is built. Sessions asking for
+    a simulation that is being built wait for it instead of building it again.
+    '''
+
+    def __init__(self, registry=SIM_DICT, max_bytes: int = POOL_MAX_BYTES):
+        self.registry = registry
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.waits = 0
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+
+    def get(self, goal, profiler=None):
+        '''
+        Returns a copy of the pooled simulation of the goal, building it if the pool holds no
+        simulation for the current input files. The profiler is set on the copy, and used when
+        the simulation has to be built.
+        '''
+        simulation_class = self.registry[goal]
+        key = (goal, simulation_class.get_input_version(goal))
+        while True:
+            with self._lock:
+                simulation = self._entries.get(key)
+                if simulation is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    break
+                in_flight = self._in_flight.get(key)
+                if in_flight is None:
+                    self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+                self.waits += 1
+            # the simulation is being built by another session or the warmup
+            in_flight.wait()
+        if simulation is None:
+            try:
+                simulation = simulation_class(goal, profiler=profiler)
+                self._put(key, simulation)
+            finally:
+                with self._lock:
+                    self._in_flight.pop(key).set()
+        session_copy = copy.copy(simulation)
+        session_copy.profiler = profiler
+        return session_copy
+
+    def _put(self, key, simulation):
+        pooled = copy.copy(simulation)
+        pooled.profiler = None
+        size = pooled.memory_usage()
+        with self._lock:
+            for stale in [other for other in self._entries if other[0] == key[0] and other != key]:
+                self._remove(stale)
+            self._entries[key] = pooled
+            self._sizes[key] = size
+            while len(self._entries) > 1 and sum(self._sizes.values()) > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        del self._entries[key]
+        del self._sizes[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.waits = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'bytes': sum(self._sizes.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'waits': self.waits,
+                'hit_rate': self.hits / requests if requests else 0.0,
+            }
+
+
+SIMULATION_POOL = SimulationPool()
@@ -0,0 +1,130 @@
+import functools
+import json
+import logging
+import time
+import tracemalloc
+
+import pandas as pd
+
+LOGGER = logging.getLogger(__name__)
+REPORT_COLUMNS = ['phase', 'calls', 'wall_time_s', 'rows', 'vehicles', 'peak_memory_bytes', 'allocated_blocks']
+# the snapshots of the profiler are not counted as allocations of the phases
+SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__)]
+
+
+class SimulationProfiler():
+    '''
+    Collects wall time, processed rows and vehicles and, with trace_memory, the peak memory and
+    the number of allocated memory blocks of every phase of a simulation, see profiled.
+
+    allocated_blocks is the number of blocks allocated by the phase and not freed at its end,
+    from the difference of tracemalloc snapshots as retained_blocks in benchmarks/bench_sim.py.
+    Taking the snapshots slows the phases down, their wall time is only meaningful without
+    trace_memory.
+
+    A simulation is profiled if its attribute profiler is set, e.g.
+    CarSimulation('M1', profiler=SimulationProfiler()). Phases may be nested, e.g. calc_factors
+    within run; the time of a phase includes the time of the nested phases.
+    '''
+
+    def __init__(self, trace_memory: bool = False):
+        self.trace_memory = trace_memory
+        self.records = []
+        # peak memory of the enclosing phases, tracemalloc only knows one peak
+        self._peaks = []
+
+    def start(self) -> dict:
+        frame = {'start': time.perf_counter()}
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # before the peak is reset, the snapshot itself is not part of the peak of the phase
+            frame['snapshot'] = take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            tracemalloc.reset_peak()
+            frame['memory'] = current
+            self._peaks.append(current)
+        return frame
+
+    def stop(self, frame: dict, phase: str, rows=None, vehicles=None):
+        record = {
+            'phase': phase,
+            'wall_time_s': time.perf_counter() - frame['start'],
+            'rows': rows,
+            'vehicles': vehicles,
+            'peak_memory_bytes': None,
+            'allocated_blocks': None,
+        }
+        if self.trace_memory:
+            peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+            record['peak_memory_bytes'] = peak - frame['memory']
+            differences = take_snapshot().compare_to(frame.pop('snapshot'), 'filename')
+            record['allocated_blocks'] = sum(stat.count_diff for stat in differences)
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], peak)
+            else:
+                tracemalloc.stop()
+        self.records.append(record)
+
+    def clear(self):
+        self.records = []
+
+    def report(self) -> pd.DataFrame:
+        '''
+        Summarizes the records per phase in the order the phases were first entered: number of
+        calls, total wall time, rows and vehicles of the last call, maximum peak memory and
+        maximum number of allocated blocks.
+        '''
+        if not self.records:
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        df = pd.DataFrame(self.records)
+        report = df.groupby('phase', sort=False).agg(
+            calls=('phase', 'size'),
+            wall_time_s=('wall_time_s', 'sum'),
+            rows=('rows', 'last'),
+            vehicles=('vehicles', 'last'),
+            peak_memory_bytes=('peak_memory_bytes', 'max'),
+            allocated_blocks=('allocated_blocks', 'max'),
+        )
+        return report.reset_index()[REPORT_COLUMNS]
+
+    def log_report(self, name: str):
+        '''
+        Writes the report as one JSON line per phase to the log.
+        '''
+        for record in self.report().to_dict('records'):
+            record = {key: (None if pd.isna(value) else value) for key, value in record.items()}
+            LOGGER.info('%s %s', name, json.dumps(record, default=float))
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+
+def profiled(phase: str, count=None):
+    '''
+    Decorator of simulation methods that records the phase in the profiler of the simulation.
+    Without profiler the method is called directly.
+
+    count is called with the simulation and the result of the method and returns the number
+    of rows and vehicles processed (None if not applicable).
+    '''
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.profiler
+            if profiler is None:
+                return method(self, *args, **kwargs)
+            frame = profiler.start()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception:
+                profiler.stop(frame, phase)
+                raise
+            rows, vehicles = count(self, result) if count is not None else (None, None)
+            profiler.stop(frame, phase, rows, vehicles)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,40 @@
+import importlib
+
+
+class SimulationRegistry():
+    '''
+    Maps goal ids to simulation classes, declared as 'module:ClassName'. The module of a goal
+    is imported on first access, so only the simulations of goals actually selected are loaded.
+    '''
+
+    def __init__(self, goals: dict):
+        self._paths = dict(goals)
+        self._classes = {}
+
+    def __contains__(self, goal) -> bool:
+        return goal in self._paths
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def keys(self):
+        return self._paths.keys()
+
+    def __getitem__(self, goal):
+        if goal not in self._classes:
+            module_name, class_name = self._paths[goal].split(':')
+            self._classes[goal] = getattr(importlib.import_module(module_name), class_name)
+        return self._classes[goal]
+
+    def register(self, goal: str, path: str):
+        self._paths[goal] = path
+        self._classes.pop(goal, None)
+
+
+SIM_DICT = SimulationRegistry({
+    'M1': 'sim.m1:CarSimulation',
+    'M2': 'sim.m2:TruckSimulation',
+})
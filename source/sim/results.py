@@ -0,0 +1,139 @@
+import os
+
+import pandas as pd
+
+from datastore import DATA_STORE, file_lock
+
+RESULT_COLUMNS = ['ziel', 'jahr', 'serie', 'wert', 'szenario']
+
+
+class ResultStore():
+    '''
+    Simulation results partitioned by goal and scenario: one file path/<goal>/<scenario>.csv
+    per partition, in the melted format of factors.csv (ziel, jahr, serie, wert, szenario).
+
+    Writing the results of a goal replaces the partitions of that goal only, reading a scenario
+    parses only its partition, so the cost depends on the size of one goal and not on the number
+    of goals. Goals that have never been written are read from legacy_file, the former
+    factors.csv holding the results of all goals.
+
+    The partitions of a goal are replaced under the lock of the goal (path/<goal>.lock, see
+    datastore.file_lock), and read_scenarios reads under the same lock, so concurrent writes of
+    a goal do not mix their partitions and readers never see a goal that is half written.
+
+    If DATA_STORE writes legacy_file to a backend (see sqlstore.SqliteBackend), the results of all
+    goals are kept in its table instead of the partition files, and read by goal and scenario
+    from its index.
+    '''
+
+    def __init__(self, path: str, legacy_file: str = None):
+        self.path = path
+        self.legacy_file = legacy_file
+
+    def get_partition_path(self, goal, scenario) -> str:
+        for name in (str(goal), str(scenario)):
+            if not name or os.sep in name or name in ('.', '..'):
+                raise ValueError(f'{name!r} cannot be used as name of a partition')
+        return os.path.join(self.path, str(goal), f'{scenario}.csv')
+
+    def get_goal_path(self, goal) -> str:
+        return os.path.join(self.path, str(goal))
+
+    def lock(self, goal):
+        '''
+        Returns a context holding the lock of the goal, the directory of its partitions need
+        not exist.
+        '''
+        os.makedirs(self.path, exist_ok=True)
+        return file_lock(self.get_goal_path(goal))
+
+    def uses_backend(self) -> bool:
+        return self.legacy_file is not None and DATA_STORE.uses_backend(self.legacy_file)
+
+    def has_goal(self, goal) -> bool:
+        return os.path.isdir(self.get_goal_path(goal))
+
+    def scenarios(self, goal) -> list:
+        if self.uses_backend():
+            return sorted(self.read_goal(goal)['szenario'].astype(str).unique())
+        if not self.has_goal(goal):
+            return []
+        return sorted(name[:-len('.csv')] for name in os.listdir(self.get_goal_path(goal)) if name.endswith('.csv'))
+
+    def _has_legacy_file(self) -> bool:
+        if self.legacy_file is None:
+            return False
+        try:
+            # the file or the table of the backend
+            DATA_STORE.get_version(self.legacy_file)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _reads_legacy_file(self, goal) -> bool:
+        return self.uses_backend() or not self.has_goal(goal)
+
+    def get_version(self, goal) -> tuple:
+        '''
+        Returns modification time and size of the partitions of the goal, or the version of the
+        legacy file if the goal has no partitions.
+        '''
+        if self._reads_legacy_file(goal):
+            return (('', *DATA_STORE.get_version(self.legacy_file)),) if self._has_legacy_file() else ()
+        return tuple(
+            (scenario, *DATA_STORE.get_version(self.get_partition_path(goal, scenario)))
+            for scenario in self.scenarios(goal)
+        )
+
+    def read(self, goal, scenario) -> pd.DataFrame:
+        '''
+        Returns the results of one scenario of a goal, an empty frame if there are none.
+        '''
+        if self._reads_legacy_file(goal):
+            if self._has_legacy_file():
+                return DATA_STORE.read(self.legacy_file, where={'ziel': goal, 'szenario': scenario})
+        else:
+            path = self.get_partition_path(goal, scenario)
+            if os.path.exists(path):
+                return DATA_STORE.read(path)
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+    def read_scenarios(self, goal, scenarios) -> dict:
+        '''
+        Returns the results of the given scenarios of a goal, all from the same write of the goal.
+        '''
+        if self._reads_legacy_file(goal):
+            return {scenario: self.read(goal, scenario) for scenario in scenarios}
+        with self.lock(goal):
+            return {scenario: self.read(goal, scenario) for scenario in scenarios}
+
+    def read_goal(self, goal) -> pd.DataFrame:
+        if self._reads_legacy_file(goal):
+            if self._has_legacy_file():
+                return DATA_STORE.read(self.legacy_file, where={'ziel': goal})
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        with self.lock(goal):
+            frames = [self.read(goal, scenario) for scenario in self.scenarios(goal)]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+
+    def write(self, goal, frames: dict):
+        '''
+        Replaces the results of a goal by frames, a dict with the melted results per scenario.
+        Partitions of other goals are not touched, partitions of scenarios of the goal that are
+        not in frames are removed.
+
+        Without frames, e.g. for a goal without intervals, nothing is written: an empty
+        partition directory would hide the rows of the goal in legacy_file.
+        '''
+        if not frames:
+            return
+        if self.uses_backend():
+            df = pd.concat([df[RESULT_COLUMNS] for df in frames.values()], ignore_index=True)
+            DATA_STORE.replace_rows(self.legacy_file, 'ziel', goal, df)
+            return
+        with self.lock(goal):
+            os.makedirs(self.get_goal_path(goal), exist_ok=True)
+            for scenario in set(self.scenarios(goal)) - {str(scenario) for scenario in frames}:
+                os.remove(self.get_partition_path(goal, scenario))
+            for scenario, df in frames.items():
+                DATA_STORE.write(self.get_partition_path(goal, scenario), df[RESULT_COLUMNS])
@@ -0,0 +1,63 @@
+import math
+from enum import Enum
+
+import numpy as np
+
+# the oldest age class of an initial fleet is where the survival drops below this value
+MIN_SURVIVAL = 1e-6
+
+
+class Retirement(Enum):
+    # every vehicle is replaced when it reaches the age f2
+    AGE_LIMIT = 1
+    # vehicles are replaced at random following a Weibull survival curve with mean age f2
+    SURVIVAL = 2
+
+
+def weibull_scale(mean_age, shape: float):
+    '''
+    Returns the scale of the Weibull distribution with the given mean and shape.
+    '''
+    return np.asarray(mean_age, dtype=float) / math.gamma(1 + 1 / shape)
+
+
+def survival(ages, mean_age, shape: float) -> np.ndarray:
+    '''
+    Share of the vehicles still in the fleet at the given ages, with shape (scenarios, ages)
+    for one mean age per scenario.
+    '''
+    scale = np.reshape(weibull_scale(mean_age, shape), (-1, 1))
+    return np.exp(-(np.asarray(ages, dtype=float) / scale) ** shape)
+
+
+def retirement_probabilities(num_age_classes: int, mean_age, shape: float) -> np.ndarray:
+    '''
+    Probability that a vehicle of age a is retired at the beginning of the year,
+    1 - S(a) / S(a - 1), as array with shape (scenarios, ages). Vehicles of age 0 are never
+    retired, undefined mean ages (NaN) retire nothing, like the age limit.
+    '''
+    ages = np.arange(num_age_classes)
+    surviving = survival(ages, mean_age, shape)
+    probabilities = np.zeros_like(surviving)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        probabilities[:, 1:] = 1 - surviving[:, 1:] / surviving[:, :-1]
+    # beyond the survival curve every vehicle is retired
+    probabilities[:, 1:][surviving[:, :-1] == 0] = 1
+    return np.clip(np.nan_to_num(probabilities, nan=0.0), 0, 1)
+
+
+def oldest_age(mean_age, shape: float) -> int:
+    '''
+    Age at which the survival of the highest mean age drops below MIN_SURVIVAL.
+    '''
+    scale = np.nanmax(weibull_scale(mean_age, shape))
+    return math.ceil(scale * (-math.log(MIN_SURVIVAL)) ** (1 / shape))
+
+
+def stationary_age_distribution(num_age_classes: int, mean_age, shape: float) -> np.ndarray:
+    '''
+    Age distribution of a fleet with constant yearly registrations and the given survival curve:
+    the share of age a is proportional to S(a). Shape (scenarios, ages), rows sum to 1.
+    '''
+    weights = survival(np.arange(num_age_classes), mean_age, shape)
+    return weights / weights.sum(axis=1, keepdims=True)
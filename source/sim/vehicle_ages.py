@@ -0,0 +1,130 @@
+'''
+Age distribution of the registered vehicles, aggregated from extracts of the vehicle registry
+with one row per vehicle (see source/import_vehicle_ages.py). The extract is read in chunks and
+aggregated into the number of vehicles per class, age and powertrain, so memory does not depend
+on the size of the extract. Only the aggregate is kept, in vehicle_ages.csv with the columns
+jahr, klasse, antrieb, alter and anzahl, from which the simulations with InitialAges.REGISTRY
+draw the ages of their initial fleet.
+'''
+from enum import Enum
+
+import numpy as np
+import pandas as pd
+
+from sim.fleet import Powertrain
+
+# columns of the extract: year of the first registration, vehicle class and fuel
+REGISTRATION_YEAR_COLUMN = 'erstzulassung_jahr'
+CLASS_COLUMN = 'fahrzeugart'
+FUEL_COLUMN = 'treibstoff'
+# fuels counted as emission free (Powertrain.ELECTRIC), compared case-insensitively
+EMISSION_FREE_FUELS = ('elektrisch', 'wasserstoff')
+# vehicles older than MAX_AGE are counted in the age class MAX_AGE
+MAX_AGE = 50
+CHUNK_SIZE = 500_000
+AGES_COLUMNS = ['jahr', 'klasse', 'antrieb', 'alter', 'anzahl']
+
+
+class InitialAges(Enum):
+    # ages drawn uniformly up to max_age_gas and max_age_electric
+    UNIFORM = 1
+    # ages drawn from the age distribution of the vehicle registry, see get_age_distribution
+    REGISTRY = 2
+
+
+class AgeHistogram():
+    '''
+    Number of vehicles per class, age and powertrain, accumulated chunk by chunk.
+
+    counts[class, age, powertrain] with the classes numbered in the order they first appear,
+    see class_names.
+    '''
+
+    def __init__(self, max_age: int = MAX_AGE):
+        self.max_age = max_age
+        self.class_ids = {}
+        self.counts = np.zeros((0, max_age + 1, len(Powertrain)), dtype=np.int64)
+        self.rows = 0
+        self.skipped = 0
+
+    @property
+    def class_names(self) -> list:
+        return list(self.class_ids)
+
+    def add(self, registration_years, classes: pd.Categorical, emission_free, reference_year: int):
+        '''
+        Adds vehicles given as arrays of the same length: year of the first registration (NaN if
+        unknown), class and a bool for the emission free vehicles. Vehicles without year or class
+        or registered after the reference year are skipped.
+        '''
+        ages = reference_year - np.asarray(registration_years, dtype=float)
+        class_codes = np.asarray(classes.codes)
+        valid = ~np.isnan(ages) & (ages >= 0) & (class_codes >= 0)
+        self.rows += len(ages)
+        self.skipped += int(len(ages) - valid.sum())
+
+        ids = np.array([self.class_ids.setdefault(str(name), len(self.class_ids)) for name in classes.categories],
+                       dtype=np.int64)
+        if len(self.class_ids) > self.counts.shape[0]:
+            extension = np.zeros((len(self.class_ids) - self.counts.shape[0],) + self.counts.shape[1:], dtype=np.int64)
+            self.counts = np.concatenate([self.counts, extension])
+        class_ids = ids[class_codes[valid]]
+        ages = np.minimum(ages[valid], self.max_age).astype(np.int64)
+        powertrains = np.where(np.asarray(emission_free)[valid], Powertrain.ELECTRIC.value, Powertrain.GAS.value)
+        # one bincount over the flat index of the histogram instead of a groupby per chunk
+        flat = (class_ids * (self.max_age + 1) + ages) * len(Powertrain) + powertrains
+        self.counts += np.bincount(flat, minlength=self.counts.size).reshape(self.counts.shape)
+
+    def to_frame(self, reference_year: int) -> pd.DataFrame:
+        '''
+        Returns the histogram in the format of vehicle_ages.csv, without empty age classes.
+        '''
+        class_index, ages, powertrains = np.nonzero(self.counts)
+        names = np.array(self.class_names, dtype=object)
+        return pd.DataFrame({
+            'jahr': reference_year,
+            'klasse': names[class_index],
+            'antrieb': powertrains,
+            'alter': ages,
+            'anzahl': self.counts[class_index, ages, powertrains],
+        }, columns=AGES_COLUMNS)
+
+
+def aggregate_registrations(path: str, reference_year: int, sep: str = ';', chunk_size: int = CHUNK_SIZE,
+                            year_column: str = REGISTRATION_YEAR_COLUMN, class_column: str = CLASS_COLUMN,
+                            fuel_column: str = FUEL_COLUMN, emission_free_fuels=EMISSION_FREE_FUELS,
+                            max_age: int = MAX_AGE) -> AgeHistogram:
+    '''
+    Streams the registry extract at path in chunks of chunk_size rows and returns the age
+    histogram of the vehicles in reference_year. Only the three columns are parsed, classes and
+    fuels as categoricals, so a chunk holds a few bytes per vehicle.
+    '''
+    emission_free_fuels = {fuel.lower() for fuel in emission_free_fuels}
+    histogram = AgeHistogram(max_age)
+    chunks = pd.read_csv(
+        path, sep=sep, usecols=[year_column, class_column, fuel_column], chunksize=chunk_size,
+        dtype={year_column: 'float64', class_column: 'category', fuel_column: 'category'},
+    )
+    for chunk in chunks:
+        fuels = chunk[fuel_column].cat
+        # one flag per fuel category, missing fuels (code -1) take the appended False
+        flags = np.append(fuels.categories.astype(str).str.strip().str.lower().isin(emission_free_fuels), False)
+        histogram.add(
+            chunk[year_column].to_numpy(), chunk[class_column].array, flags[fuels.codes.to_numpy()], reference_year
+        )
+    return histogram
+
+
+def get_age_distribution(ages_df: pd.DataFrame, year: int):
+    '''
+    Returns the number of vehicles per age and powertrain as array with shape (ages, powertrains),
+    summed over the classes in ages_df, of the latest year up to year. None if there is no such year.
+    '''
+    years = ages_df['jahr'][ages_df['jahr'] <= year]
+    if len(years) == 0:
+        return None
+    df = ages_df[ages_df['jahr'] == years.max()]
+    ages = df['alter'].to_numpy(dtype=np.int64)
+    counts = np.zeros((ages.max() + 1, len(Powertrain)), dtype=np.int64)
+    np.add.at(counts, (ages, df['antrieb'].to_numpy(dtype=np.int64)), df['anzahl'].to_numpy(dtype=np.int64))
+    return counts
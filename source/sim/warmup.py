@@ -0,0 +1,118 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from datastore import DATA_STORE
+from sim.base_sim import DATA_PATH
+from sim.pool import SIMULATION_POOL
+from sim.registry import SIM_DICT
+
+LOGGER = logging.getLogger(__name__)
+# threads building and running the simulations, can be set with KSS_WARMUP_THREADS
+WARMUP_THREADS = int(os.environ.get('KSS_WARMUP_THREADS', 2))
+
+
+class Warmup():
+    '''
+    Loads the data of the app before the first request of a new server process: reads every
+    table of data_path into DATA_STORE, builds the simulation of every goal in SIMULATION_POOL
+    and runs it, so that its result is in RESULT_CACHE.
+
+    start runs the warmup in background threads and returns at once. Sessions asking for a
+    simulation or result that the warmup is computing wait for it (see SimulationPool.get and
+    ResultCache.get_or_compute) instead of computing it a second time. Goals without intervals
+    have nothing to simulate and are skipped. A goal that fails is logged and skipped, the app
+    then builds it on first use as without warmup.
+    '''
+
+    def __init__(self, registry=SIM_DICT, data_path: str = DATA_PATH, max_workers: int = WARMUP_THREADS):
+        self.registry = registry
+        self.data_path = data_path
+        self.max_workers = max_workers
+        self.started = None
+        self.finished = None
+        self.tables = 0
+        self.goals = []
+        self.skipped = []
+        self.errors = {}
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> bool:
+        '''
+        Starts the warmup, only once per instance. Returns False if it was already started.
+        '''
+        with self._lock:
+            if self.started is not None:
+                return False
+            self.started = time.perf_counter()
+        threading.Thread(target=self._run, name='warmup', daemon=True).start()
+        return True
+
+    def _run(self):
+        LOGGER.info('warmup started')
+        try:
+            self.load_tables()
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='warmup') as executor:
+                list(executor.map(self.warm_goal, list(self.registry)))
+        finally:
+            self.finished = time.perf_counter()
+            self._done.set()
+        LOGGER.info(
+            'warmup done in %.2f s: %d tables, goals %s, skipped %s, errors %s',
+            self.finished - self.started, self.tables, self.goals, self.skipped or 'none', list(self.errors) or 'none',
+        )
+
+    def load_tables(self):
+        for name in sorted(os.listdir(self.data_path)):
+            path = os.path.join(self.data_path, name)
+            if not name.endswith('.csv') or not os.path.isfile(path):
+                continue
+            try:
+                DATA_STORE.read(path)
+                self.tables += 1
+            except Exception as e:
+                LOGGER.warning('warmup could not read %s: %s', name, e)
+
+    def warm_goal(self, goal):
+        try:
+            simulation = SIMULATION_POOL.get(goal)
+            if not simulation.has_intervals():
+                self.skipped.append(goal)
+                LOGGER.info('warmup skips goal %s: no intervals, nothing to simulate', goal)
+                return
+            simulation.run()
+            self.goals.append(goal)
+        except Exception as e:
+            self.errors[goal] = f'{type(e).__name__}: {e}'
+            LOGGER.warning('warmup of goal %s failed', goal, exc_info=True)
+
+    def wait(self, timeout: float = None) -> bool:
+        '''
+        Waits until the warmup is done. Returns False if it is not done after timeout seconds.
+        '''
+        return self._done.wait(timeout)
+
+    def is_done(self) -> bool:
+        return self._done.is_set()
+
+    def status(self) -> dict:
+        if self.started is None:
+            state, seconds = 'nicht gestartet', None
+        elif not self.is_done():
+            state, seconds = 'läuft', time.perf_counter() - self.started
+        else:
+            state, seconds = 'fertig', self.finished - self.started
+        return {
+            'state': state,
+            'seconds': seconds,
+            'tables': self.tables,
+            'goals': list(self.goals),
+            'skipped': list(self.skipped),
+            'errors': dict(self.errors),
+        }
+
+
+WARMUP = Warmup()
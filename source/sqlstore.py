@@ -0,0 +1,240 @@
+"""
+Optional SQLite backend of the DataStore. The tables of source/data are kept in one SQLite
+database with indexes on the columns the app filters by, so reading the rows of one goal,
+scenario or time series is an index lookup instead of a scan of the whole table.
+
+The backend is enabled with the environment variable KSS_DATA_BACKEND=sqlite, the database is
+source/data/data.sqlite or the file set in KSS_SQLITE_PATH. It is filled from the CSV files with
+
+    python source/sqlstore.py                   # imports all CSV files and saved results
+    python source/sqlstore.py --db other.sqlite
+
+Tables that are not in the database are still read from their CSV files.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import schemas
+
+DATA_PATH = "./source/data"
+SQLITE_PATH = os.environ.get("KSS_SQLITE_PATH", os.path.join(DATA_PATH, "data.sqlite"))
+# indexes per table, in the order of the columns the readers filter by
+INDEXES = {
+    "time_series": [("ts_id", "jahr")],
+    "time_series_goal": [("ts_id",), ("goal",)],
+    "scenario_intervals": [("ziel", "szenario", "faktor")],
+    "factors": [("ziel", "szenario", "serie", "jahr")],
+    "vehicle_ages": [("klasse", "jahr")],
+}
+# directory of the results partitioned by goal and scenario, imported into the table factors
+RESULTS_DIR = "factors"
+VERSIONS_TABLE = "_versions"
+
+
+def quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def get_sql_type(dtype) -> str:
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def to_sql_value(value):
+    # numpy scalars cannot be bound as parameters
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class SqliteBackend():
+    """
+    Stores the CSV files of data_path as tables of the database at db_path, one table per file
+    named after the file without .csv. Every write replaces rows in a single transaction and
+    increases the version of the table, which takes the place of the modification time of the
+    CSV file. The database runs in WAL mode, so readers never wait for writers.
+    """
+
+    def __init__(self, db_path: str = SQLITE_PATH, data_path: str = DATA_PATH):
+        self.db_path = db_path
+        self.data_path = os.path.abspath(data_path)
+        self._local = threading.local()
+        connection = self.connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {VERSIONS_TABLE} (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+
+    def connect(self) -> sqlite3.Connection:
+        # one connection per thread and process, sqlite3 connections must not be shared between
+        # threads or inherited by forked workers
+        pid, connection = getattr(self._local, "connection", (None, None))
+        if pid != os.getpid():
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def handles(self, path: str) -> bool:
+        """
+        True for the CSV files directly in data_path.
+        """
+        return os.path.dirname(os.path.abspath(path)) == self.data_path
+
+    @staticmethod
+    def get_table_name(path: str) -> str:
+        return os.path.splitext(os.path.basename(path))[0]
+
+    def has_table(self, path: str) -> bool:
+        row = self.connect().execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (self.get_table_name(path),)
+        ).fetchone()
+        return row is not None
+
+    def get_version(self, path: str) -> tuple:
+        row = self.connect().execute(
+            f"SELECT version FROM {VERSIONS_TABLE} WHERE name = ?", (self.get_table_name(path),)
+        ).fetchone()
+        if row is None:
+            raise FileNotFoundError(f"{path}: no table {self.get_table_name(path)} in {self.db_path}")
+        return row[0], 0
+
+    def read(self, path: str, where: dict = None) -> pd.DataFrame:
+        """
+        Returns the rows of the table matching where, a dict of column and value or list of
+        values, in the dtypes of the schema of the file.
+        """
+        query = f"SELECT * FROM {quote(self.get_table_name(path))}"
+        conditions, params = [], []
+        for column, value in (where or {}).items():
+            if pd.api.types.is_list_like(value):
+                values = [to_sql_value(v) for v in value]
+                conditions.append(f"{quote(column)} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            else:
+                conditions.append(f"{quote(column)} = ?")
+                params.append(to_sql_value(value))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        # rows in the order they were written, as in the CSV file
+        query += " ORDER BY rowid"
+        connection = self.connect()
+        cursor = connection.execute(query, params)
+        columns = [description[0] for description in cursor.description]
+        rows = cursor.fetchall()
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        schema = schemas.get_schema(path)
+        if schema is not None:
+            # straight into the dtypes of the schema, much faster than DataFrame.astype
+            return pd.DataFrame({
+                column: pd.Categorical(column_values) if schema[column] == "category"
+                else np.array(column_values, dtype=schema[column])
+                for column, column_values in zip(columns, values)
+            }, columns=columns, copy=False)
+        df = pd.DataFrame.from_records(rows, columns=columns)
+        # columns without values are returned as None, numbers are parsed as read_csv would
+        table_info = connection.execute(f"PRAGMA table_info({quote(self.get_table_name(path))})")
+        for column, sql_type in ((row[1], row[2]) for row in table_info):
+            if sql_type in ("INTEGER", "REAL") and df[column].dtype == object:
+                df[column] = pd.to_numeric(df[column]).astype("float64")
+        return df
+
+    def write(self, path: str, df: pd.DataFrame):
+        self._replace(path, df, "")
+
+    def replace_rows(self, path: str, column: str, value, df: pd.DataFrame):
+        self._replace(path, df, f"WHERE {quote(column)} = ?", (to_sql_value(value),))
+
+    def _replace(self, path: str, df: pd.DataFrame, condition: str, params: tuple = ()):
+        table = quote(self.get_table_name(path))
+        rows = df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)
+        connection = self.connect()
+        try:
+            # BEGIN IMMEDIATE takes the write lock at once, so concurrent writers are serialized
+            connection.execute("BEGIN IMMEDIATE")
+            self._create_table(connection, path, df)
+            connection.execute(f"DELETE FROM {table} {condition}", params)
+            connection.executemany(
+                f"INSERT INTO {table} ({', '.join(quote(str(c)) for c in df.columns)}) "
+                f"VALUES ({', '.join('?' * len(df.columns))})",
+                ([to_sql_value(value) for value in row] for row in rows),
+            )
+            connection.execute(
+                f"INSERT INTO {VERSIONS_TABLE} (name, version) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1",
+                (self.get_table_name(path),),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+    def _create_table(self, connection: sqlite3.Connection, path: str, df: pd.DataFrame):
+        name = self.get_table_name(path)
+        schema = schemas.get_schema(path) or {str(column): dtype for column, dtype in df.dtypes.items()}
+        columns = ", ".join(f"{quote(column)} {get_sql_type(dtype)}" for column, dtype in schema.items())
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {quote(name)} ({columns})")
+        for index_columns in INDEXES.get(name, []):
+            index_name = quote(f"idx_{name}_{'_'.join(index_columns)}")
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS {index_name} ON {quote(name)} ({', '.join(map(quote, index_columns))})"
+            )
+
+
+def import_csv_files(backend: SqliteBackend, data_path: str = DATA_PATH) -> dict:
+    """
+    Loads every CSV file in data_path into the database, replacing the tables, and the results
+    saved per goal and scenario into the table factors.
+
+    Returns:
+        dict: number of imported rows per table.
+    """
+    imported = {}
+    for name in sorted(os.listdir(data_path)):
+        path = os.path.join(data_path, name)
+        if not name.endswith(".csv") or not os.path.isfile(path):
+            continue
+        schema = schemas.get_schema(path)
+        df = pd.read_csv(path, sep=";") if schema is None else schemas.read_csv(path, schema)
+        backend.write(path, df)
+        imported[backend.get_table_name(path)] = len(df)
+    results_path = os.path.join(data_path, RESULTS_DIR)
+    if os.path.isdir(results_path):
+        factors_file = os.path.join(data_path, RESULTS_DIR + ".csv")
+        for goal in sorted(os.listdir(results_path)):
+            goal_path = os.path.join(results_path, goal)
+            if not os.path.isdir(goal_path):
+                # e.g. the lock file of the goal, see sim.results.ResultStore
+                continue
+            files = sorted(name for name in os.listdir(goal_path) if name.endswith(".csv"))
+            if not files:
+                continue
+            df = pd.concat(
+                [schemas.read_csv(os.path.join(goal_path, name), schemas.SCHEMAS["factors.csv"]) for name in files],
+                ignore_index=True,
+            )
+            backend.replace_rows(factors_file, "ziel", goal, df)
+            imported[f"{RESULTS_DIR}/{goal}"] = len(df)
+    return imported
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Imports the CSV files of source/data into the SQLite database.")
+    parser.add_argument("--db", default=SQLITE_PATH, help=f"database file (default: {SQLITE_PATH})")
+    args = parser.parse_args(argv)
+    backend = SqliteBackend(args.db)
+    for table, rows in import_csv_files(backend).items():
+        print(f"{table:<32} {rows:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    # DATA_PATH is relative to the root of the repository
+    os.chdir(Path(__file__).resolve().parent.parent)
+    sys.exit(main())
@@ -0,0 +1,77 @@
+'''
+Shared fixtures of the tests. The simulations run on small synthetic inputs in a temporary
+directory, so the tests never read or write the files in source/data.
+'''
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'source'))
+
+from sim.base_sim import FLEET_CHECKPOINTS, SCENARIO_INTERVALS_FILE, SIM_START_YEAR, TIME_SERIES_FILE  # noqa: E402
+from sim.cache import RESULT_CACHE  # noqa: E402
+from sim.m1 import BaseData, CarSimulation  # noqa: E402
+
+NUM_VEHICLES = 20_000
+LAST_YEAR = SIM_START_YEAR + 16
+
+
+def write_inputs(path: str):
+    '''
+    Writes the scenario intervals of goal M1 with three scenarios and five-year intervals, and
+    the base data of the years before the simulation.
+    '''
+    rows = []
+    for scenario, growth, replacement_age, share in [('L', 0.99, 14.0, 0.2), ('M', 1.0, 12.0, 0.4), ('H', 1.01, 10.0, 0.6)]:
+        for year_from in range(SIM_START_YEAR, LAST_YEAR + 1, 5):
+            year_to = min(year_from + 4, LAST_YEAR)
+            rows.append(('M1', scenario, 'f1', year_from, year_to, growth, growth))
+            rows.append(('M1', scenario, 'f2', year_from, year_to, replacement_age, replacement_age))
+            rows.append(('M1', scenario, 'f3', year_from, year_to, share, min(1.0, share + 0.2)))
+    pd.DataFrame(rows, columns=['ziel', 'szenario', 'faktor', 'jahr_von', 'jahr_bis', 'wert_von', 'wert_bis']).to_csv(
+        os.path.join(path, SCENARIO_INTERVALS_FILE), sep=';', index=False
+    )
+    history = []
+    for year in range(SIM_START_YEAR - 3, SIM_START_YEAR):
+        history.append((BaseData.TS_TOTAL.value, year, NUM_VEHICLES))
+        history.append((BaseData.TS_ELECTRIC.value, year, NUM_VEHICLES // 25))
+    pd.DataFrame(history, columns=['ts_id', 'jahr', 'wert']).to_csv(
+        os.path.join(path, TIME_SERIES_FILE), sep=';', index=False
+    )
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    RESULT_CACHE.clear()
+    FLEET_CHECKPOINTS.clear()
+    yield
+    RESULT_CACHE.clear()
+    FLEET_CHECKPOINTS.clear()
+
+
+@pytest.fixture
+def data_path(tmp_path) -> str:
+    write_inputs(str(tmp_path))
+    return str(tmp_path)
+
+
+@pytest.fixture
+def simulation_class(data_path):
+    '''
+    CarSimulation reading and writing its files in data_path.
+    '''
+    return type('SyntheticCarSimulation', (CarSimulation,), {'data_path': data_path, 'last_year': LAST_YEAR})
+
+
+def edit_intervals(intervals_df: pd.DataFrame, factor: str, year_from: int, scale: float) -> pd.DataFrame:
+    '''
+    Returns a copy of the intervals with the values of factor scaled in the intervals starting
+    in or after year_from.
+    '''
+    df = intervals_df.copy()
+    rows = (df['faktor'] == factor) & (df['jahr_von'] >= year_from)
+    df.loc[rows, ['wert_von', 'wert_bis']] *= scale
+    return df
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import sim.base_sim
+from conftest import edit_intervals
+from sim.base_sim import SCENARIO_INTERVALS_FILE, SIM_START_YEAR, TIME_SERIES_FILE, VEHICLE_AGES_FILE
+from sim.cache import RESULT_CACHE, ResultCache
+from sim.m1 import BaseData
+from sim.survival import Retirement
+from sim.vehicle_ages import InitialAges
+
+SEED = 0
+
+
+def update_time_series(data_path, year, ts_id, value):
+    path = os.path.join(data_path, TIME_SERIES_FILE)
+    df = pd.read_csv(path, sep=';')
+    df.loc[(df['jahr'] == year) & (df['ts_id'] == ts_id), 'wert'] = value
+    df.to_csv(path, sep=';', index=False)
+
+
+def test_same_inputs_give_the_same_key(simulation_class):
+    assert simulation_class('M1').get_cache_key(SEED) == simulation_class('M1').get_cache_key(SEED)
+
+
+def test_second_run_is_taken_from_the_cache(simulation_class):
+    expected = simulation_class('M1').run(SEED)
+
+    result = simulation_class('M1').run(SEED)
+
+    assert RESULT_CACHE.stats()['hits'] == 1
+    for scenario, df in expected.items():
+        pd.testing.assert_frame_equal(result[scenario], df)
+
+
+@pytest.mark.parametrize('factor', ['f1', 'f2', 'f3'])
+def test_edited_intervals_change_the_key(simulation_class, factor):
+    simulation = simulation_class('M1')
+    key = simulation.get_cache_key(SEED)
+
+    simulation.intervals_df = edit_intervals(simulation.intervals_df, factor, SIM_START_YEAR + 10, 0.9)
+
+    assert simulation.get_cache_key(SEED) != key
+
+
+def test_intervals_of_other_goals_do_not_change_the_key(simulation_class, data_path):
+    key = simulation_class('M1').get_cache_key(SEED)
+    path = os.path.join(data_path, SCENARIO_INTERVALS_FILE)
+    df = pd.read_csv(path, sep=';')
+    # rows of another goal before those of M1 also shift the index of the rows of M1
+    pd.concat([df.assign(ziel='M3'), df], ignore_index=True).to_csv(path, sep=';', index=False)
+
+    assert simulation_class('M1').get_cache_key(SEED) == key
+
+
+def test_seed_changes_the_key(simulation_class):
+    simulation = simulation_class('M1')
+
+    assert simulation.get_cache_key(SEED) != simulation.get_cache_key(SEED + 1)
+
+
+def test_base_data_of_the_start_year_changes_the_key(simulation_class, data_path):
+    key = simulation_class('M1').get_cache_key(SEED)
+
+    update_time_series(data_path, SIM_START_YEAR - 1, BaseData.TS_ELECTRIC.value, 12345)
+
+    assert simulation_class('M1').get_cache_key(SEED) != key
+
+
+def test_base_data_of_earlier_years_do_not_change_the_key(simulation_class, data_path):
+    key = simulation_class('M1').get_cache_key(SEED)
+
+    update_time_series(data_path, SIM_START_YEAR - 3, BaseData.TS_ELECTRIC.value, 12345)
+
+    assert simulation_class('M1').get_cache_key(SEED) == key
+
+
+def test_simulated_years_change_the_key(simulation_class):
+    key = simulation_class('M1').get_cache_key(SEED)
+    shorter = type('ShorterSimulation', (simulation_class,), {'last_year': simulation_class.last_year - 1})
+
+    assert shorter('M1').get_cache_key(SEED) != key
+
+
+def test_engine_version_changes_the_key(simulation_class, monkeypatch):
+    simulation = simulation_class('M1')
+    key = simulation.get_cache_key(SEED)
+
+    monkeypatch.setattr(sim.base_sim, 'ENGINE_VERSION', sim.base_sim.ENGINE_VERSION + 1)
+
+    assert simulation.get_cache_key(SEED) != key
+
+
+def test_retirement_changes_the_key(simulation_class):
+    simulation = simulation_class('M1')
+    key = simulation.get_cache_key(SEED)
+
+    simulation.scenario_retirement = {'H': Retirement.SURVIVAL}
+    survival_key = simulation.get_cache_key(SEED)
+    simulation.weibull_shape = 2.0
+
+    assert len({key, survival_key, simulation.get_cache_key(SEED)}) == 3
+
+
+def test_registry_ages_change_the_key_only_with_an_age_distribution(simulation_class, data_path):
+    simulation = simulation_class('M1')
+    key = simulation.get_cache_key(SEED)
+    simulation.initial_ages = InitialAges.REGISTRY
+    # without vehicle_ages.csv the fleet is drawn with uniform ages as before
+    assert simulation.get_cache_key(SEED) == key
+
+    pd.DataFrame({
+        'jahr': SIM_START_YEAR - 1, 'klasse': 'Personenwagen', 'antrieb': [0, 0, 1], 'alter': [0, 5, 1], 'anzahl': [10, 20, 5],
+    }).to_csv(os.path.join(data_path, VEHICLE_AGES_FILE), sep=';', index=False)
+    simulation = simulation_class('M1')
+    registry_key = simulation.get_cache_key(SEED)
+    simulation.initial_ages = InitialAges.REGISTRY
+
+    assert registry_key == key
+    assert simulation.get_cache_key(SEED) != key
+
+
+def test_profiler_does_not_change_the_key(simulation_class):
+    from sim.profiling import SimulationProfiler
+
+    assert simulation_class('M1', profiler=SimulationProfiler()).get_cache_key(SEED) == \
+        simulation_class('M1').get_cache_key(SEED)
+
+
+def test_cached_results_are_copies():
+    cache = ResultCache()
+    cache.put('key', {'M': pd.DataFrame({'wert': [1.0]})})
+
+    result = cache.get('key')
+    result['M'].loc[0, 'wert'] = 2.0
+
+    assert cache.get('key')['M'].loc[0, 'wert'] == 1.0
+
+
+def test_least_recently_used_result_is_evicted():
+    cache = ResultCache(max_size=2)
+    for key in ['a', 'b']:
+        cache.put(key, {})
+    cache.get('a')
+
+    cache.put('c', {})
+
+    assert cache.get('b') is None
+    assert cache.get('a') == {} and cache.get('c') == {}
+
+
+def test_concurrent_requests_compute_a_result_once():
+    cache = ResultCache()
+    calls = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {'M': pd.DataFrame({'wert': [1.0]})}
+
+    first = threading.Thread(target=cache.get_or_compute, args=('key', compute))
+    first.start()
+    started.wait()
+    results = []
+    second = threading.Thread(target=lambda: results.append(cache.get_or_compute('key', compute)))
+    second.start()
+    while cache.stats()['waits'] == 0:
+        time.sleep(0.001)
+    release.set()
+    first.join()
+    second.join()
+
+    assert len(calls) == 1
+    assert results[0]['M'].loc[0, 'wert'] == 1.0
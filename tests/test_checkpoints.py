@@ -0,0 +1,88 @@
+import numpy as np
+
+from conftest import edit_intervals
+from sim.base_sim import FLEET_CHECKPOINTS, FLEET_CHECKPOINTS_LOCK, SIM_START_YEAR
+
+SEED = 7
+EDIT_YEAR = SIM_START_YEAR + 10
+
+
+def full_run(simulation_class, intervals_df):
+    simulation = simulation_class('M1')
+    simulation.checkpoints_enabled = False
+    simulation.intervals_df = intervals_df
+    return simulation.simulate_fleet(SEED), simulation.history
+
+
+def assert_same_run(series, history, expected_series, expected_history):
+    for name, values in expected_series.items():
+        np.testing.assert_array_equal(series[name], values, err_msg=name)
+    for name in ['counts', 'retired', 'removed', 'added']:
+        np.testing.assert_array_equal(getattr(history, name), getattr(expected_history, name), err_msg=name)
+
+
+def test_resume_gives_the_result_of_a_full_run(simulation_class):
+    simulation = simulation_class('M1')
+    simulation.simulate_fleet(SEED)
+    edited = edit_intervals(simulation.intervals_df, 'f3', EDIT_YEAR, 0.5)
+    simulation.intervals_df = edited
+
+    series = simulation.simulate_fleet(SEED)
+
+    assert simulation.resume_year == EDIT_YEAR
+    assert_same_run(series, simulation.history, *full_run(simulation_class, edited))
+
+
+def test_unchanged_factors_resume_after_the_last_year(simulation_class):
+    simulation = simulation_class('M1')
+    expected = simulation.simulate_fleet(SEED)
+
+    series = simulation.simulate_fleet(SEED)
+
+    assert simulation.resume_year == simulation.last_year + 1
+    for name, values in expected.items():
+        np.testing.assert_array_equal(series[name], values)
+
+
+def test_other_seed_runs_from_the_first_year(simulation_class):
+    simulation = simulation_class('M1')
+    simulation.simulate_fleet(SEED)
+
+    simulation.simulate_fleet(SEED + 1)
+
+    assert simulation.resume_year == simulation.first_year
+
+
+def test_resume_uses_the_checkpoints_it_compared(simulation_class):
+    # another session replaces the checkpoints of the goal between the comparison and the resume
+    simulation = simulation_class('M1')
+    simulation.simulate_fleet(SEED)
+    edited = edit_intervals(simulation.intervals_df, 'f3', EDIT_YEAR, 0.5)
+    simulation.intervals_df = edited
+    other = simulation_class('M1')
+    other.intervals_df = edit_intervals(other.intervals_df, 'f2', SIM_START_YEAR, 1.5)
+    get_resume_index = simulation.get_resume_index
+
+    def get_resume_index_then_replace(factors, seed):
+        result = get_resume_index(factors, seed)
+        other.simulate_fleet(SEED)
+        return result
+
+    simulation.get_resume_index = get_resume_index_then_replace
+    series = simulation.simulate_fleet(SEED)
+
+    assert simulation.resume_year == EDIT_YEAR
+    assert_same_run(series, simulation.history, *full_run(simulation_class, edited))
+    # the checkpoints of the last run replace those of the other session
+    checkpoints = FLEET_CHECKPOINTS[(simulation_class.__name__, 'M1')]
+    np.testing.assert_array_equal(checkpoints['factors'], simulation.get_factor_values(['f1', 'f2', 'f3']))
+
+
+def test_disabled_checkpoints_do_not_wait_for_the_lock(simulation_class):
+    # e.g. a worker of run_ensemble forked while another thread held the lock
+    simulation = simulation_class('M1')
+    simulation.checkpoints_enabled = False
+    factors = simulation.get_factor_values(['f1', 'f2', 'f3'])
+
+    with FLEET_CHECKPOINTS_LOCK:
+        assert simulation.get_resume_index(factors, SEED) == (0, None)
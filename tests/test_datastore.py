@@ -0,0 +1,139 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from datastore import DataStore
+from schemas import SchemaError
+from sqlstore import SqliteBackend
+
+INTERVAL_COLUMNS = ['ziel', 'szenario', 'faktor', 'jahr_von', 'jahr_bis', 'wert_von', 'wert_bis']
+
+
+def intervals(goal, scenarios, value=1.0) -> pd.DataFrame:
+    return pd.DataFrame(
+        [(goal, scenario, 'f1', 2024, 2040, value, value) for scenario in scenarios], columns=INTERVAL_COLUMNS
+    )
+
+
+@pytest.fixture(params=['csv', 'sqlite'])
+def store(request, tmp_path) -> DataStore:
+    if request.param == 'csv':
+        return DataStore()
+    return DataStore(SqliteBackend(str(tmp_path / 'data.sqlite'), data_path=str(tmp_path)))
+
+
+@pytest.fixture
+def path(store, tmp_path) -> str:
+    path = str(tmp_path / 'scenario_intervals.csv')
+    store.write(path, pd.concat([intervals('M1', ['L', 'M']), intervals('M2', ['L']), intervals('M3', ['H'])]))
+    return path
+
+
+def rows(df: pd.DataFrame) -> list:
+    return list(df[['ziel', 'szenario', 'wert_von']].astype({'ziel': str, 'szenario': str}).itertuples(index=False, name=None))
+
+
+def test_replace_rows_keeps_the_rows_of_other_values(store, path):
+    store.replace_rows(path, 'ziel', 'M2', intervals('M2', ['M', 'H'], 2.0))
+
+    assert rows(store.read(path)) == [
+        ('M1', 'L', 1.0), ('M1', 'M', 1.0), ('M3', 'H', 1.0), ('M2', 'M', 2.0), ('M2', 'H', 2.0),
+    ]
+
+
+def test_replace_rows_sets_the_column_of_the_new_rows(store, path):
+    # rows edited in the app may have lost or changed the goal
+    written = store.replace_rows(path, 'ziel', 'M2', intervals('', ['M'], 2.0))
+
+    assert list(written['ziel']) == ['M2']
+    assert rows(store.read(path, where={'ziel': 'M2'})) == [('M2', 'M', 2.0)]
+
+
+def test_replace_rows_with_no_rows_removes_the_value(store, path):
+    store.replace_rows(path, 'ziel', 'M1', intervals('M1', []))
+
+    assert rows(store.read(path)) == [('M2', 'L', 1.0), ('M3', 'H', 1.0)]
+
+
+def test_replace_rows_creates_a_missing_table(store, tmp_path):
+    path = str(tmp_path / 'scenario_intervals.csv')
+
+    store.replace_rows(path, 'ziel', 'M1', intervals('M1', ['L']))
+
+    assert rows(store.read(path)) == [('M1', 'L', 1.0)]
+
+
+def test_replace_rows_keeps_the_dtypes_of_the_schema(store, path):
+    before = store.read(path).dtypes
+
+    store.replace_rows(path, 'ziel', 'M2', intervals('M2', ['M'], 2.0))
+
+    pd.testing.assert_series_equal(store.read(path).dtypes, before)
+
+
+def test_replace_rows_is_seen_by_other_stores(store, path):
+    other = DataStore(store.backend)
+    other.read(path)
+
+    store.replace_rows(path, 'ziel', 'M2', intervals('M2', ['M'], 2.0))
+
+    assert rows(other.read(path, where={'ziel': 'M2'})) == [('M2', 'M', 2.0)]
+
+
+def test_concurrent_replace_rows_of_different_values_are_merged(store, path):
+    goals = [f'G{i}' for i in range(8)]
+
+    with ThreadPoolExecutor(max_workers=len(goals)) as executor:
+        list(executor.map(lambda goal: store.replace_rows(path, 'ziel', goal, intervals(goal, ['L', 'M'])), goals))
+
+    df = store.read(path)
+    assert sorted(set(df['ziel'].astype(str))) == sorted(['M1', 'M2', 'M3'] + goals)
+    assert all((df['ziel'] == goal).sum() == 2 for goal in goals)
+
+
+def test_replace_rows_leaves_no_temporary_files(tmp_path):
+    store = DataStore()
+    path = str(tmp_path / 'scenario_intervals.csv')
+    store.write(path, intervals('M1', ['L']))
+
+    store.replace_rows(path, 'ziel', 'M2', intervals('M2', ['M'], 2.0))
+
+    assert sorted(name for name in os.listdir(tmp_path) if not name.endswith(('.npz', '.lock'))) == [
+        'scenario_intervals.csv'
+    ]
+
+
+@pytest.mark.parametrize('column, value', [('jahr_bis', None), ('jahr_von', 2030.5), ('wert_von', 'x')])
+def test_replace_rows_rejects_rows_not_matching_the_schema(store, path, column, value):
+    before = store.read(path)
+    # e.g. a cell cleared in the interval editor
+    df = intervals('M2', ['M'], 2.0).astype({column: object})
+    df.loc[0, column] = value
+
+    with pytest.raises(SchemaError):
+        store.replace_rows(path, 'ziel', 'M2', df)
+
+    store.invalidate()
+    pd.testing.assert_frame_equal(store.read(path), before)
+
+
+def test_write_rejects_a_table_not_matching_the_schema(store, path):
+    before = store.read(path)
+
+    with pytest.raises(SchemaError):
+        store.write(path, intervals('M1', ['L']).drop(columns='wert_bis'))
+
+    store.invalidate()
+    pd.testing.assert_frame_equal(store.read(path), before)
+
+
+@pytest.mark.parametrize('where', [None, {'ziel': 'M1'}])
+def test_writing_into_a_categorical_column_of_a_read_leaves_the_store_unchanged(store, path, where):
+    df = store.read(path, where=where)
+    assert isinstance(df['szenario'].dtype, pd.CategoricalDtype)
+
+    df.loc[df.index[0], 'szenario'] = 'M'
+
+    assert rows(store.read(path))[0] == ('M1', 'L', 1.0)
@@ -0,0 +1,49 @@
+import pandas as pd
+
+from sim.profiling import REPORT_COLUMNS, SimulationProfiler, profiled
+
+NUM_OBJECTS = 1000
+
+
+class Allocating():
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.kept = []
+
+    @profiled('allocate', count=lambda self, result: (len(result), None))
+    def allocate(self):
+        # distinct objects, each in its own memory block
+        self.kept = [object() for _ in range(NUM_OBJECTS)]
+        return self.kept
+
+    @profiled('outer')
+    def outer(self):
+        return self.allocate()
+
+
+def test_report_counts_the_blocks_allocated_by_a_phase():
+    profiler = SimulationProfiler(trace_memory=True)
+
+    Allocating(profiler).outer()
+
+    report = profiler.report().set_index('phase')
+    assert list(profiler.report().columns) == REPORT_COLUMNS
+    assert report.loc['allocate', 'rows'] == NUM_OBJECTS
+    assert NUM_OBJECTS <= report.loc['allocate', 'allocated_blocks'] < 2 * NUM_OBJECTS
+    # the allocations of a phase include those of the nested phases
+    assert report.loc['outer', 'allocated_blocks'] >= report.loc['allocate', 'allocated_blocks']
+    assert report.loc['allocate', 'peak_memory_bytes'] > 0
+
+
+def test_allocations_are_only_counted_with_trace_memory():
+    profiler = SimulationProfiler()
+
+    Allocating(profiler).outer()
+
+    report = profiler.report()
+    assert report['allocated_blocks'].isna().all() and report['peak_memory_bytes'].isna().all()
+    assert (report['wall_time_s'] > 0).all()
+
+
+def test_report_of_a_profiler_without_records_has_the_columns():
+    pd.testing.assert_index_equal(SimulationProfiler().report().columns, pd.Index(REPORT_COLUMNS))
@@ -0,0 +1,96 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+import sim.results
+from datastore import DATA_STORE
+from sim.results import RESULT_COLUMNS, ResultStore
+from sqlstore import SqliteBackend, import_csv_files
+
+
+def results(goal, scenario, value, num_years=3) -> pd.DataFrame:
+    return pd.DataFrame({
+        'ziel': goal, 'jahr': range(2024, 2024 + num_years), 'serie': 'total', 'wert': float(value), 'szenario': scenario,
+    }, columns=RESULT_COLUMNS)
+
+
+@pytest.fixture
+def store(tmp_path) -> ResultStore:
+    legacy_file = str(tmp_path / 'factors.csv')
+    DATA_STORE.write(legacy_file, pd.concat([results('M1', 'L', 1), results('M2', 'L', 1)], ignore_index=True))
+    return ResultStore(str(tmp_path / 'factors'), legacy_file=legacy_file)
+
+
+def values(store, goal) -> dict:
+    df = store.read_goal(goal)
+    return {str(scenario): set(group['wert']) for scenario, group in df.groupby('szenario', observed=True)}
+
+
+def test_write_replaces_the_partitions_of_the_goal(store):
+    store.write('M1', {'L': results('M1', 'L', 2), 'M': results('M1', 'M', 2)})
+    store.write('M1', {'M': results('M1', 'M', 3)})
+
+    assert store.scenarios('M1') == ['M']
+    assert values(store, 'M1') == {'M': {3.0}}
+    # goals without partitions are read from the legacy file
+    assert values(store, 'M2') == {'L': {1.0}}
+
+
+def test_write_without_frames_keeps_the_legacy_results(store):
+    store.write('M1', {})
+
+    assert not store.has_goal('M1')
+    assert values(store, 'M1') == {'L': {1.0}}
+
+
+def test_concurrent_writes_of_a_goal_do_not_mix(store):
+    runs = [{scenario: results('M1', scenario, run) for scenario in ['L', 'M', 'H'][:run % 3 + 1]} for run in range(12)]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda frames: store.write('M1', frames), runs))
+
+    written = values(store, 'M1')
+    assert len(set.union(*written.values())) == 1
+    run = int(written['L'].pop())
+    assert sorted(written) == sorted(runs[run])
+
+
+def test_readers_wait_for_a_write_of_the_goal(store, monkeypatch):
+    store.write('M1', {'L': results('M1', 'L', 1), 'M': results('M1', 'M', 1)})
+    written = threading.Event()
+    release = threading.Event()
+    write = DATA_STORE.write
+
+    def write_slowly(path, df, *args):
+        # the write stops after the first partition of the goal
+        write(path, df, *args)
+        written.set()
+        release.wait()
+
+    monkeypatch.setattr(sim.results.DATA_STORE, 'write', write_slowly)
+    writer = threading.Thread(target=store.write, args=('M1', {'L': results('M1', 'L', 2), 'M': results('M1', 'M', 2)}))
+    writer.start()
+    read = []
+    reader = threading.Thread(target=lambda: read.append(store.read_scenarios('M1', ['L', 'M'])))
+    try:
+        written.wait()
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive()
+    finally:
+        release.set()
+        writer.join()
+    reader.join()
+    assert {scenario: set(df['wert']) for scenario, df in read[0].items()} == {'L': {2.0}, 'M': {2.0}}
+
+
+def test_import_into_the_database_skips_the_lock_files_of_the_goals(store, tmp_path):
+    store.write('M1', {'L': results('M1', 'L', 2)})
+    assert os.path.exists(os.path.join(store.path, 'M1.lock'))
+
+    imported = import_csv_files(SqliteBackend(str(tmp_path / 'data.sqlite'), data_path=str(tmp_path)), str(tmp_path))
+
+    assert imported['factors/M1'] == 3